@@ -1,191 +1,353 @@
-import pandas as pd
+import numpy as np
 import logging
+import re
+import unicodedata
 from datetime import datetime
-import time
-import random
-from difflib import SequenceMatcher
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
+from collections import defaultdict
 
 # Import custom modules
+import disk_cache
 from database import OddsBreakerDB
-from scraper_365 import Scraper365
+from scraper_365 import Scraper365, build_session
 from rl_engine import RLEngine
-from main_engine import PredictionEngine
-from sofa_odds import SofaOdds
+from sofa_odds import SofaOdds, frac_to_decimal
 
 logger = logging.getLogger("AutoBetManager")
 
+# Max concurrent HTTP fetches per daily batch (I/O-bound, GIL released on sockets)
+FETCH_WORKERS = 20
+
+_TOKEN_RE = re.compile(r"\w+")
+# Club-type affixes that differ between feeds and carry no identity
+_NAME_STOPWORDS = frozenset({"fc", "cf", "sc", "ac"})
+# Min average home/away Jaccard for a SofaScore event to count as the same fixture
+MATCH_THRESHOLD = 0.5
+
+def _name_tokens(name):
+    """Accent-stripped, case-folded word tokens of a team name, club affixes dropped."""
+    # Drop only the combining marks: ø, ß, Ł and non-Latin scripts are kept (ß folds to ss)
+    plain = ''.join(c for c in unicodedata.normalize('NFKD', name or '') if not unicodedata.combining(c)).casefold()
+    return frozenset(_TOKEN_RE.findall(plain)) - _NAME_STOPWORDS
+
+def _jaccard(a, b):
+    union = len(a | b)
+    return len(a & b) / union if union else 0.0
+
+def _games_columns(games):
+    """Flattens the 365Scores games payload into parallel column lists in one pass."""
+    cols = {k: [] for k in ("id", "home", "away", "league", "finished", "home_score", "away_score")}
+    for g in games:
+        home = g.get('homeCompetitor') or {}
+        away = g.get('awayCompetitor') or {}
+        cols["id"].append(g.get('id'))
+        cols["home"].append(home.get('name'))
+        cols["away"].append(away.get('name'))
+        cols["league"].append(g.get('competitionDisplayName'))
+        cols["finished"].append((g.get('status') or {}).get('type') == 'Finished')
+        cols["home_score"].append(home.get('score'))
+        cols["away_score"].append(away.get('score'))
+    return cols
+
+_home = itemgetter('homeCompetitor')
+_away = itemgetter('awayCompetitor')
+
+# RL input columns, in OddsAbsoluteRNN order
+FEATURE_NAMES = (
+    "home_strength", "away_strength", "home_defense", "away_defense",
+    "home_form", "away_form", "home_minutes_load", "away_minutes_load",
+    "home_motivation", "away_motivation", "home_days_rest", "away_days_rest",
+    "wind_factor", "rain_factor"
+)
+
+def _build_features(implied_h, implied_a):
+    """Derives the (N, 14) RL feature matrix from implied home/away probabilities."""
+    implied_h = np.asarray(implied_h, dtype=np.float32)
+    implied_a = np.asarray(implied_a, dtype=np.float32)
+    feats = np.empty((len(implied_h), len(FEATURE_NAMES)), dtype=np.float32)
+    col = dict(zip(FEATURE_NAMES, feats.T))  # column views, filled in place
+    col["home_strength"][:] = implied_h * 3.0
+    col["away_strength"][:] = implied_a * 3.0
+    col["home_defense"][:] = implied_a * 2.0
+    col["away_defense"][:] = implied_h * 2.0
+    col["home_form"][:] = implied_h
+    col["away_form"][:] = implied_a
+    col["home_minutes_load"][:] = 0.5
+    col["away_minutes_load"][:] = 0.5
+    col["home_motivation"][:] = np.where(implied_h > 0.6, 1.0, 0.5)
+    col["away_motivation"][:] = 0.5
+    col["home_days_rest"][:] = 4
+    col["away_days_rest"][:] = 4
+    col["wind_factor"][:] = 0.1
+    col["rain_factor"][:] = 0.1
+    return feats
+
+# SofaScore 1X2 choice name -> odds column
+_ODDS_COL = {"1": 0, "X": 1, "2": 2}
+DEFAULT_ODDS = (2.5, 3.2, 2.8)
+
+# Full-Kelly fraction cap per bet (share of bankroll)
+KELLY_CAP = 0.05
+# Flat stake for the heuristic side markets: their EVs are assumed constants, so Kelly on them
+# would always clip to KELLY_CAP
+SIDE_STAKE_PCT = 0.01
+
+def _kelly_fraction(ev, odds):
+    """Kelly f* = (p*o - 1)/(o - 1) = ev/(o - 1), clipped to [0, KELLY_CAP]; scalars or arrays."""
+    return np.clip(np.asarray(ev) / (np.asarray(odds) - 1.0), 0.0, KELLY_CAP)
+
+def _select_1x2(ev_mat, threshold):
+    """Home (0) if its EV clears the threshold, else Away (2), else -1; plus the chosen EV."""
+    selections = np.where(ev_mat[:, 0] > threshold, 0, np.where(ev_mat[:, 2] > threshold, 2, -1))
+    chosen_ev = ev_mat[np.arange(len(ev_mat)), np.maximum(selections, 0)]
+    return selections, chosen_ev
+
+def _top_k(values, k):
+    """Indices of the k largest values, highest first (argpartition, so O(n) before the final sort)."""
+    if k <= 0: return np.empty(0, dtype=int)
+    idx = np.argpartition(-values, k - 1)[:k] if len(values) > k else np.arange(len(values))
+    return idx[np.argsort(-values[idx], kind='stable')]
+
+# Heuristic side markets: (SofaScore market key, label, odds, assumed EV); bit k of the side mask = entry k
+SIDE_MARKETS = (
+    ("Corners", "Corners Over 8.5", 1.85, 0.15),  # strong favourite / high attack (boosted EV)
+    ("Goals", "Over 2.5 Goals", 1.90, 0.12),      # open game
+    ("BTTS", "BTTS Yes", 1.80, 0.10),             # balanced teams
+)
+
+def _decide(odds, probs, threshold):
+    """
+    Whole-batch decision kernel over (N, 3) odds and model probabilities.
+    Returns: (selection, chosen odds, chosen EV, Kelly fraction, int8 side-market bitmask)
+    """
+    selections, chosen_ev = _select_1x2(probs * odds - 1, threshold)
+    chosen_odds = odds[np.arange(len(odds)), np.maximum(selections, 0)]
+    implied_h, implied_a = 1.0 / odds[:, 0], 1.0 / odds[:, 2]
+    side = ((implied_h > 0.55) | (implied_h * 3.0 > 1.3)).astype(np.int8)  # home_strength feature = 3 * implied
+    side |= ((probs[:, 0] > 0.35) & (probs[:, 2] > 0.25)).astype(np.int8) << 1
+    side |= (np.abs(implied_h - implied_a) < 0.2).astype(np.int8) << 2
+    return selections, chosen_odds, chosen_ev, _kelly_fraction(chosen_ev, chosen_odds), side
+
 class AutoBetManager:
     def __init__(self):
         self.db = OddsBreakerDB()
-        self.scraper = Scraper365()
+        # One pooled keep-alive session shared by both HTTP clients (no TLS handshake per request)
+        self._http = build_session()
+        self.scraper = Scraper365(session=self._http)
         self.rl_engine = RLEngine()
-        self.sofa = SofaOdds()
+        self.sofa = SofaOdds(session=self._http)
         self.cached_sofa_events = []
+        self._sofa_index = []  # (event_id, home_tokens, away_tokens), rebuilt on refresh
+        self._sofa_tokens = {}  # name token -> positions in _sofa_index
         self.last_cache_date = None
 
-    def _similar(self, a, b):
-        return SequenceMatcher(None, a.lower(), b.lower()).ratio()
+    def close(self):
+        """Releases the pooled HTTP connections."""
+        self._http.close()
 
-    def _find_sofa_id(self, h_name, a_name):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _refresh_sofa_events(self):
         today = datetime.now().strftime("%Y-%m-%d")
         if self.last_cache_date != today:
             self.cached_sofa_events = self.sofa.fetch_events(today)
+            # Normalize the SofaScore side once per refresh, not once per comparison
+            self._sofa_index = [(ev.get('id'), _name_tokens(ev.get('homeTeam', {}).get('name')), _name_tokens(ev.get('awayTeam', {}).get('name')))
+                                for ev in self.cached_sofa_events]
+            # Inverted index: only events sharing a name token with the fixture are fuzzy-matched
+            tokens = defaultdict(list)
+            for i, (_, sh, sa) in enumerate(self._sofa_index):
+                for tok in sh | sa: tokens[tok].append(i)
+            self._sofa_tokens = dict(tokens)
             self.last_cache_date = today
-            
+
+    def _find_sofa_id(self, h_name, a_name):
+        self._refresh_sofa_events()
+        h, a = _name_tokens(h_name), _name_tokens(a_name)
         best_match = None
-        best_score = 0
-        for ev in self.cached_sofa_events:
-            sh = ev.get('homeTeam', {}).get('name', '')
-            sa = ev.get('awayTeam', {}).get('name', '')
-            score = (self._similar(h_name, sh) + self._similar(a_name, sa)) / 2
-            if score > 0.65 and score > best_score:
+        best_score = MATCH_THRESHOLD
+        # Token-set Jaccard per side, only over events sharing at least one token
+        for i in sorted(set().union(*(self._sofa_tokens.get(t, ()) for t in h | a))):
+            ev_id, sh, sa = self._sofa_index[i]
+            score = (_jaccard(h, sh) + _jaccard(a, sa)) / 2
+            if score > best_score:
                 best_score = score
-                best_match = ev.get('id')
+                best_match = ev_id
         return best_match if best_match else None
 
+    def _fetch_game_odds(self, game_id, h_name, a_name):
+        """
+        Network half of the pipeline for one game -> (sofa_data, base_odds), or None on error.
+        base_odds are default/community 1X2 odds; SofaScore fractional prices are parsed later for the whole batch.
+        """
+        try:
+            sofa_id = self._find_sofa_id(h_name, a_name)
+            sofa_data = self.sofa.process_game_odds(sofa_id) if sofa_id else None
+            
+            base_odds = DEFAULT_ODDS
+            if not (sofa_data and sofa_data.get("1X2")):
+                # Community votes only when SofaScore has no market
+                comm = self.scraper.get_game_predictions(game_id)
+                if comm and comm.get('totalVotes', 0) > 50:
+                    base_odds = tuple(round(1 / (comm[k]/100 + 0.05), 2) for k in ("1", "X", "2"))
+            return sofa_data, base_odds
+        except Exception as e:
+            logger.error(f"Error game {game_id}: {e}")
+            return None
+
     def generate_daily_bets(self, confidence_threshold=0.01, max_bets=15):
         logger.info("Starting Daily Auto-Bet Generation (ULTRA MODE)...")
-        today_str = datetime.now().strftime("%d/%m/%Y")
+        run_ts = datetime.now()  # one timestamp for the whole batch
+        today_str = run_ts.strftime("%d/%m/%Y")
         games = self.scraper.get_games(today_str)
         if not games: return 0
-        bets_placed = 0
         
-        for game in games:
-            if bets_placed >= max_bets: break
+        # Phase 1: odds per game, I/O-bound so fanned out over threads.
+        # The shared SofaScore event list is loaded first so workers only read it.
+        self._refresh_sofa_events()
+        cols = _games_columns(games)
+        with ThreadPoolExecutor(max_workers=min(FETCH_WORKERS, len(games))) as pool:
+            fetched = list(pool.map(self._fetch_game_odds, cols["id"], cols["home"], cols["away"]))
+        keep = [i for i, r in enumerate(fetched) if r]
+        if not keep: return 0
+        cols = {k: [v[i] for i in keep] for k, v in cols.items()}
+        sofa_list = [fetched[i][0] for i in keep]
+        n = len(keep)
+        
+        # Phase 2: features, model and EV for every game at once
+        odds_arr = np.array([fetched[i][1] for i in keep], dtype=float)  # (N, 3)
+        # Overlay SofaScore 1X2 prices, parsed in one pass for every game
+        cells, fracs = [], []
+        for i, sofa_data in enumerate(sofa_list):
+            for c in (sofa_data or {}).get("1X2") or []:
+                j = _ODDS_COL.get(c.get('name'))
+                if j is not None:
+                    cells.append((i, j)); fracs.append(c.get('fractionalValue'))
+        if fracs:
+            r, c = np.array(cells).T
+            dec = np.fromiter(map(frac_to_decimal, fracs), dtype=float, count=len(fracs))
+            ok = np.isfinite(dec) & (dec > 0)
+            odds_arr[r[ok], c[ok]] = dec[ok]
+        implied = 1.0 / odds_arr
+        implied_h, implied_a = implied[:, 0], implied[:, 2]
+        features = _build_features(implied_h, implied_a)  # (N, 14)
+        # Games without real odds share the DEFAULT_ODDS feature row: one forward per distinct row
+        uniq, inv = np.unique(features, axis=0, return_inverse=True)
+        probs = self.rl_engine.predict_batch(uniq)[inv.reshape(-1)]  # (N, 3)
+        selections, chosen_odds, chosen_ev, kelly, side = _decide(odds_arr, probs, confidence_threshold)
+        bankroll = self.db.get_bankroll()  # read once per batch
+        stakes_1x2 = np.round(bankroll * kelly, 2)
+        # Side markets have no model edge to size on: one small flat stake for all of them
+        side_stake = round(bankroll * SIDE_STAKE_PCT, 2)
+        
+        # One batched upsert for every scanned game, before any bet row references it (FK)
+        self.db.save_match_data_many([{
+            "game_id": gid, "date": run_ts, "home_team": hn, "away_team": an, "league_name": lg,
+            "odds_home": float(o[0]), "odds_draw": float(o[1]), "odds_away": float(o[2]),
+            "result": None, "home_score": None, "away_score": None
+        } for gid, hn, an, lg, o in zip(cols["id"], cols["home"], cols["away"], cols["league"], odds_arr)])
+        
+        # Phase 3: every candidate bet, then the max_bets best by model EV (not the first games in feed order)
+        bet_rows = []  # (game_id, selection, odds, stake, ev, is_auto), flushed in one transaction
+        bet_meta = []  # per bet: final score if the game already finished, plus implied probs
+        is_side = []   # per bet: heuristic side market (assumed EV, not comparable with model EVs)
+        for i, sofa_data in enumerate(sofa_list):
+            game_id = cols["id"][i]
             try:
-                game_id = game.get('id')
-                h_name = game.get('homeCompetitor', {}).get('name')
-                a_name = game.get('awayCompetitor', {}).get('name')
-                
-                sofa_id = self._find_sofa_id(h_name, a_name)
-                sofa_data = self.sofa.process_game_odds(sofa_id) if sofa_id else None
-                
-                odds_1x2 = {"1": 2.5, "X": 3.2, "2": 2.8} 
-                if sofa_data and sofa_data.get("1X2"):
-                    for c in sofa_data["1X2"]:
-                        val = c.get('fractionalValue')
-                        dec = float(val.split('/')[0])/float(val.split('/')[1]) + 1 if '/' in str(val) else float(val)
-                        if c['name'] == '1': odds_1x2["1"] = dec
-                        elif c['name'] == 'X': odds_1x2["X"] = dec
-                        elif c['name'] == '2': odds_1x2["2"] = dec
-                else:
-                    comm = self.scraper.get_game_predictions(game_id)
-                    if comm and comm.get('totalVotes', 0) > 50:
-                        odds_1x2 = {
-                            "1": round(1 / (comm['1']/100 + 0.05), 2),
-                            "X": round(1 / (comm['X']/100 + 0.05), 2),
-                            "2": round(1 / (comm['2']/100 + 0.05), 2)
-                        }
+                final = (cols["home_score"][i], cols["away_score"][i]) if cols["finished"][i] else None
                 
-                implied_h = 1.0 / odds_1x2.get("1", 2.5)
-                implied_a = 1.0 / odds_1x2.get("2", 2.5)
-                features = [
-                    round(implied_h * 3.0, 2), round(implied_a * 3.0, 2),
-                    round(implied_a * 2.0, 2), round(implied_h * 2.0, 2),
-                    round(implied_h, 2), round(implied_a, 2),
-                    0.5, 0.5, 
-                    1.0 if implied_h > 0.6 else 0.5, 0.5, 
-                    4, 4, 0.1, 0.1
-                ]
-                probs = self.rl_engine.predict(features)
-                
-                ev_1 = (probs["1"] * odds_1x2["1"]) - 1
-                ev_2 = (probs["2"] * odds_1x2["2"]) - 1
+                def place(lbl, odds, ev, stake, side_market=False):
+                    if stake <= 0: return  # no edge -> Kelly says no bet
+                    bet_rows.append((game_id, lbl, odds, stake, round(ev, 3), True))
+                    bet_meta.append((final, float(implied_h[i]), float(implied_a[i])))
+                    is_side.append(side_market)
                 
                 # BETTING LOGIC (Relaxed for Action)
-                if ev_1 > confidence_threshold:
-                    self._place_bet_safe(game_id, "1", odds_1x2["1"], ev_1)
-                    bets_placed += 1
-                elif ev_2 > confidence_threshold:
-                    self._place_bet_safe(game_id, "2", odds_1x2["2"], ev_2)
-                    bets_placed += 1
-                    
-                if sofa_data:
-                    # CORNERS: Ultra Aggressive
-                    # If Home implied > 55% (Strong Favorite) OR High Attack -> Bet Over Corners
-                    if sofa_data.get("Corners") and (implied_h > 0.55 or features[0] > 1.3):
-                         self._place_bet_safe(game_id, "Corners Over 8.5", 1.85, 0.15) # Boosted EV
-                         bets_placed += 1
-                    
-                    # GOALS: Open Game
-                    if sofa_data.get("Goals") and (probs["1"] > 0.35 and probs["2"] > 0.25):
-                         self._place_bet_safe(game_id, "Over 2.5 Goals", 1.90, 0.12)
-                         bets_placed += 1
+                if selections[i] >= 0:
+                    lbl = "1" if selections[i] == 0 else "2"
+                    place(lbl, float(chosen_odds[i]), float(chosen_ev[i]), float(stakes_1x2[i]))
                     
-                    # BTTS: Balanced Teams
-                    if sofa_data.get("BTTS") and abs(implied_h - implied_a) < 0.2:
-                         self._place_bet_safe(game_id, "BTTS Yes", 1.80, 0.10)
-                         bets_placed += 1
-
-                self.db.save_match_data({
-                    "game_id": game_id, "date": datetime.now(),
-                    "home_team": h_name, "away_team": a_name,
-                    "league_name": game.get('competitionDisplayName'),
-                    "odds_home": odds_1x2["1"], "odds_draw": odds_1x2["X"], "odds_away": odds_1x2["2"],
-                    "result": None, "home_score": None, "away_score": None
-                })
+                if sofa_data and side[i]:
+                    # CORNERS / GOALS / BTTS: condition bits come from _decide, market must be listed
+                    for bit, (key, lbl, odds, ev) in enumerate(SIDE_MARKETS):
+                        if side[i] >> bit & 1 and sofa_data.get(key):
+                            place(lbl, odds, ev, side_stake, side_market=True)
             except Exception as e:
-                logger.error(f"Error game {game.get('id')}: {e}")
+                logger.error(f"Error game {game_id}: {e}")
                 continue
-        return bets_placed
+        
+        # 1X2 picks ranked by model EV fill the budget first; side markets (fixed assumed EVs)
+        # only take what is left, in feed order, as when they always came after the game's 1X2 pick
+        is_side = np.array(is_side, dtype=bool)
+        model_idx = np.flatnonzero(~is_side)
+        top = model_idx[_top_k(np.array([bet_rows[j][4] for j in model_idx], dtype=float), max_bets)]
+        top = np.concatenate([top, np.flatnonzero(is_side)[:max(max_bets - len(top), 0)]]).astype(int)
+        bet_rows = [bet_rows[j] for j in top]
+        bet_meta = [bet_meta[j] for j in top]
+        bet_ids = self.db.place_bet_many(bet_rows)
+        if len(bet_ids) != len(bet_rows): return 0
+        
+        # Finished games: we already know the bet ids, no later resolution pass needed
+        settled = [(bid, row[0], final[0], final[1], ih, ia)
+                   for bid, row, (final, ih, ia) in zip(bet_ids, bet_rows, bet_meta) if final]
+        if settled: self._settle(settled)
+        return len(bet_rows)
 
-    def _place_bet_safe(self, game_id, selection, odds, ev, is_auto=True):
-        try:
-            stake = 10 * (1 + ev) 
-            self.db.place_bet(game_id, selection, odds, round(stake, 2), round(ev, 3), is_auto=is_auto)
-        except Exception: pass
+    def _settle(self, settled):
+        """
+        Resolves and learns from finished bets in one batch.
+        settled: list of (bet_id, game_id, home_score, away_score, implied_home, implied_away)
+        Returns: (resolved, trained)
+        """
+        # Status + PnL for every pending bet on these games: one UPDATE ... FROM in SQL
+        results = {gid: (h, a) for _, gid, h, a, _, _ in settled}
+        resolved = self.db.resolve_bets_from_results([(gid, h, a) for gid, (h, a) in results.items()])
+        
+        # Python side only builds the RL samples (bets with match odds on record)
+        samples = [s for s in settled if s[4] is not None or s[5] is not None]
+        sample_ids = [s[0] for s in samples]
+        
+        # One forward/backward pass over every resolved sample
+        trained = 0
+        if samples:
+            h = np.array([s[2] for s in samples], dtype=float)
+            a = np.array([s[3] for s in samples], dtype=float)
+            ih = np.array([s[4] or 0.4 for s in samples])  # missing side -> default 2.5 odds
+            ia = np.array([s[5] or 0.4 for s in samples])
+            # Branchless 1X2 target: sign(h-a) = 1/0/-1 -> class 0 (Home) / 1 (Draw) / 2 (Away)
+            targets = (1 - np.sign(h - a)).astype(np.int64)
+            # Same feature builder as inference, so train/predict inputs match.
+            # Samples are persisted in the replay buffer, so the bets count as learned from here on.
+            buffered = self.rl_engine.add_to_buffer(_build_features(ih, ia), targets)
+            self.db.mark_bets_as_learned(sample_ids)
+            trained = self.rl_engine.train_from_buffer()  # saves the model when it trains
+            if trained:
+                logger.info(f"Model trained on {trained} buffered samples and SAVED.")
+            else:
+                logger.info(f"{buffered} samples buffered for the next training batch.")
+        return resolved, trained
 
     def check_results_and_learn(self):
         logger.info("Resolving bets...")
-        pending = self.db.get_pending_bets()
-        if not pending: return 0, 0
-        
-        resolved = 0
-        training_samples = []
-        
         today = datetime.now().strftime("%d/%m/%Y")
-        finished_games = {g['id']: (g['homeCompetitor']['score'], g['awayCompetitor']['score']) 
-                         for g in self.scraper.get_games(today) if g.get('status',{}).get('type') == 'Finished'}
+        # Filter first so unfinished games cost a single lookup (no default dict per game)
+        finished = [g for g in self.scraper.get_games(today) if (st := g.get('status')) and st.get('type') == 'Finished']
+        finished_games = {g['id']: (_home(g)['score'], _away(g)['score']) for g in finished}
+        if not finished_games: return 0, 0
 
-        for bet in pending:
-            try:
-                # SAFE ACCESS (If bet is dict or tuple)
-                if isinstance(bet, dict): gid = bet['game_id']; lbl = bet['selection']
-                else: gid = bet[1]; lbl = bet[2] # Fallback for tuples if DB not fixed
-                
-                if gid not in finished_games: continue
-                
-                h, a = finished_games[gid]
-                won = False
-                
-                if lbl == "1": won = h > a
-                elif lbl == "X": won = h == a
-                elif lbl == "2": won = a > h
-                elif "Over" in lbl: won = (h+a) > 2.5
-                elif "BTTS" in lbl: won = (h>0 and a>0)
-                
-                if isinstance(bet, dict): bid = bet['bet_id']; stake = bet['stake']; odds = bet['odds']
-                else: bid = bet[0]; stake = bet[4]; odds = bet[3]
-                
-                pnl = (stake * odds) - stake if won else -stake
-                self.db.update_bet_status(bid, "WON" if won else "LOST", pnl)
-                resolved += 1
-                
-                match = self.db.get_match_data(gid)
-                if match:
-                   if isinstance(match, dict): oh = match['odds_home']; oa = match['odds_away']
-                   else: oh = match[7]; oa = match[9] 
-                   
-                   ih = 1/(oh or 2.5); ia = 1/(oa or 2.5)
-                   feats = [ih*3, ia*3, ia*2, ih*2, ih, ia, 0.5, 0.5, 1 if ih>0.6 else 0.5, 0.5, 4, 4, 0.1, 0.1]
-                   targ = [1,0,0] if h>a else ([0,1,0] if h==a else [0,0,1])
-                   training_samples.append((feats, targ))
-            except Exception as e: 
-                logger.error(f"Resolution Error: {e}")
-            
-        if training_samples:
-            self.rl_engine.train_on_batch([x[0] for x in training_samples], [x[1] for x in training_samples])
-            self.rl_engine.save_model() # PERSIST KNOWLEDGE
-            logger.info("Model trained and SAVED.")
-            
-        return resolved, len(training_samples)
+        # Only pending bets on today's finished games; match odds come from the same joined query
+        settled = []
+        for bet in self.db.get_pending_bets_with_features(finished_games):
+            # Row layout: bet_id, game_id, selection, odds, stake, implied_home, implied_away, home_attack_strength
+            bid, gid, _, _, _, ih, ia, _ = tuple(bet)
+            settled.append((bid, gid, *finished_games[gid], ih, ia))
+        
+        # Result is in: the cached community votes for these games are dead weight
+        for gid in finished_games: disk_cache.delete("predictions", gid)
+        
+        return self._settle(settled)
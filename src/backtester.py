@@ -9,15 +9,111 @@ import numpy as np
 import os
 import sys
 import logging
+import warnings
+from itertools import chain
+from joblib import Parallel, delayed
+# Optional JIT for the sequential kernels below; without numba they run as plain Python loops
+try:
+    from numba import njit
+except ImportError:
+    def njit(*args, **kwargs):
+        return args[0] if args and callable(args[0]) else (lambda fn: fn)
 
 sys.path.append(os.path.dirname(__file__))
 
-from ml_engine import ValueBetML
+from ml_engine import ValueBetML, WindowTeamStats
 from value_detector import ValueDetector
 from bankroll import BankrollManager
 
 logger = logging.getLogger("OmniscienceBacktester")
 
+# 1X2 markets in column order of the odds/probability matrices
+MARKETS = ("1", "X", "2")
+ODDS_COLS = ["B365H", "B365D", "B365A"]
+RESULT_CODES = np.array(["H", "D", "A"])
+# One value cell of the backtest (row = position in the run DataFrame), collected before the replay.
+# Odds/probability/stake arrays are float32 (the reported figures are rounded to 2-3 decimals anyway);
+# only the running bankroll is accumulated in float64
+BET_RECORD = np.dtype([("window", np.int32), ("row", np.int32), ("market", np.int8), ("prob", np.float32),
+                       ("ev", np.float32), ("stake_frac", np.float32)])
+
+
+@njit(cache=True)
+def _replay_bankroll(stake_frac, odds, won, market, bankroll, R):
+    """
+    Sequential bankroll walk over the value cells in bet order.
+    R: preallocated NaN-filled (1 + markets, cells) float32 returns matrix, filled in place through
+       per-row counters: row 0 gets every placed bet's return, row m + 1 those of market m (left-aligned).
+    Returns (stakes, profits, bankroll after each cell, final bankroll); skipped cells (< 0.01) stake 0.
+    """
+    n = len(stake_frac)
+    bankroll = np.float64(bankroll)  # float64 accumulator over float32 inputs
+    stakes = np.zeros(n)
+    profits = np.zeros(n)
+    bankrolls = np.empty(n)
+    filled = np.zeros(R.shape[0], dtype=np.int64)
+    for i in range(n):
+        stake = round(bankroll * stake_frac[i], 2)
+        if stake >= 0.01:
+            profit = stake * (odds[i] - 1) if won[i] else -stake
+            pct_return = profit / max(bankroll, 1.0)
+            bankroll += profit
+            stakes[i] = stake
+            profits[i] = profit
+            m = market[i] + 1
+            R[0, filled[0]] = pct_return
+            R[m, filled[m]] = pct_return
+            filled[0] += 1
+            filled[m] += 1
+        bankrolls[i] = bankroll
+    return stakes, profits, bankrolls, bankroll
+
+
+def _predict_windows(ml, df, team_index, windows, window_size, test_size, refit_every):
+    """
+    Train + predict for a run of consecutive windows (one refit group), independent of the bankroll.
+    Runs in a joblib worker on its own copy of `ml`; team_index is the run's WindowTeamStats.
+    Returns: list of (window_idx, probs (test_rows, 3)), probs None when training raised.
+    """
+    out = []
+    for window_idx in windows:
+        start = window_idx * test_size
+        train_end = start + window_size
+        test_end = min(train_end + test_size, len(df))
+        
+        # Train on window
+        train_df = df.iloc[start:train_end]
+        test_df = df.iloc[train_end:test_end]
+        
+        # The model fit dominates each window; skip it between refits (or until a fit succeeds)
+        refit = window_idx % refit_every == 0 or not ml.is_trained
+        
+        # Temporarily replace data for training
+        ml._team_stats = {}
+        if refit:
+            ml.is_trained = False
+        
+        # Build features (always: they refresh the team stats used to predict) and train on window
+        try:
+            X = ml._build_anonymous_features(train_df, team_index.for_slice(start, train_end))
+            if refit:
+                y = train_df['FTR'].map({'H': 0, 'D': 1, 'A': 2})
+                valid = ~y.isna().to_numpy()  # positional: X has a fresh RangeIndex
+                X = X[valid]
+                y = y[valid]
+                if len(X) > 10:
+                    ml.model_res.fit(X, y)
+                    ml.is_trained = True
+                    ml._model_epoch += 1
+        except Exception as e:
+            logger.warning(f"Window {window_idx} training failed: {e}")
+            out.append((window_idx, None))
+            continue
+        
+        probs = ml.predict_matches(test_df['HomeTeam'].to_numpy(), test_df['AwayTeam'].to_numpy())
+        out.append((window_idx, probs.astype(np.float32)))
+    return out
+
 
 class Backtester:
     def __init__(self, data_path="data/historical_data.csv"):
@@ -26,13 +122,16 @@ class Backtester:
         self.bankroll_mgr = BankrollManager(initial_bankroll=1000.0, max_stake_pct=0.05)
         self.results = []
         
-    def run_backtest(self, window_size=100, test_size=20):
+    def run_backtest(self, window_size=100, test_size=20, refit_every=1, n_jobs=-1):
         """
         Rolling-Window Backtest.
         
         Args:
             window_size: Number of matches to train on
             test_size: Number of matches to test on before re-training
+            refit_every: Re-fit the model every N windows; windows in between keep
+                         the last fit and only refresh the team stats (1 = always re-fit)
+            n_jobs: joblib workers for the train/predict phase (-1 = all cores, 1 = in-process)
             
         Returns:
             (results_df, final_bankroll, sharpe_ratio, market_analysis)
@@ -42,133 +141,112 @@ class Backtester:
             logger.warning("Not enough data for rolling backtest")
             return None, 0, 0, {}
         
-        bankroll = 1000.0
-        history = []
-        returns = []  # For Sharpe calculation
+        total_windows = (len(df) - window_size) // test_size
+        
+        # Value cells, preallocated for the worst case (every market of every test row) and filled
+        # by slice; odds/result/teams are looked up from the run arrays via (row, market)
+        bets = np.empty(total_windows * test_size * len(MARKETS), dtype=BET_RECORD)
+        n_bets = 0
         
-        # Market-specific tracking
-        market_returns = {"1": [], "X": [], "2": []}
+        # Whole-run column arrays, built once; each test window is a row slice of these
+        home_all = df['HomeTeam'].to_numpy()
+        away_all = df['AwayTeam'].to_numpy()
+        odds_all = df.reindex(columns=ODDS_COLS).to_numpy(dtype=np.float32)  # (N, 3), missing odds -> NaN
+        valid_all = ~np.isnan(odds_all)  # bettable cells, masked once instead of per-row isna checks
+        # One-hot outcome matrix: won_all[i, j] <=> match i ended in RESULT_CODES[j]
+        won_all = df['FTR'].to_numpy()[:, None] == RESULT_CODES if 'FTR' in df else np.zeros(odds_all.shape, dtype=bool)
         
-        total_windows = (len(df) - window_size) // test_size
+        # Train/predict is independent per refit group -> fan out; the bankroll replay below stays sequential
+        team_index = WindowTeamStats(df)  # window team stats by prefix-sum lookup, built once
+        groups = [range(g, min(g + refit_every, total_windows)) for g in range(0, total_windows, refit_every)]
+        predictions = Parallel(n_jobs=n_jobs)(
+            delayed(_predict_windows)(self.ml, df, team_index, g, window_size, test_size, refit_every) for g in groups
+        )
         
-        for window_idx in range(total_windows):
-            start = window_idx * test_size
-            train_end = start + window_size
-            test_end = min(train_end + test_size, len(df))
-            
-            if test_end > len(df):
-                break
-            
-            # Train on window
-            train_df = df.iloc[start:train_end]
-            test_df = df.iloc[train_end:test_end]
+        threshold = self.detector.threshold
+        kelly = self.bankroll_mgr.calculate_kelly_fraction_array
+        for window_idx, probs in chain.from_iterable(predictions):
+            if probs is None:
+                continue
+            train_end = window_idx * test_size + window_size
+            rows = slice(train_end, min(train_end + test_size, len(df)))
             
-            # Temporarily replace data for training
-            self.ml._team_stats = {}
-            self.ml.is_trained = False
+            # Test on next window: EV gate as one (rows, 3) array op
+            odds = odds_all[rows]
             
-            # Build features and train on window
-            try:
-                X = self.ml._build_anonymous_features(train_df)
-                y = train_df['FTR'].map({'H': 0, 'D': 1, 'A': 2})
-                valid = ~y.isna()
-                X = X[valid]
-                y = y[valid]
-                if len(X) > 10:
-                    self.ml.model_res.fit(X, y)
-                    self.ml.is_trained = True
-            except Exception as e:
-                logger.warning(f"Window {window_idx} training failed: {e}")
+            ev = probs * odds - 1
+            bet_mask = valid_all[rows] & (ev > threshold)  # analyze_bet's test over the whole window
+            if not bet_mask.any():
                 continue
             
-            # Test on next window
-            for _, row in test_df.iterrows():
-                home = row['HomeTeam']
-                away = row['AwayTeam']
-                
-                probs = self.ml.predict_match(home, away)
-                
-                # Check all three markets
-                for market, prob_key, odds_col, result_check in [
-                    ("1", "home_win", "B365H", "H"),
-                    ("X", "draw", "B365D", "D"),
-                    ("2", "away_win", "B365A", "A"),
-                ]:
-                    if odds_col not in row or pd.isna(row[odds_col]):
-                        continue
-                    
-                    odds = row[odds_col]
-                    model_prob = probs[prob_key]
-                    val = self.detector.analyze_bet(model_prob, odds)
-                    
-                    if val['is_value']:
-                        # Kelly Criterion staking
-                        kelly = self.bankroll_mgr.calculate_kelly_stake(odds, model_prob)
-                        stake = kelly['amount']
-                        
-                        if stake < 0.01:
-                            continue
-                        
-                        won = row.get('FTR', '') == result_check
-                        profit = (stake * (odds - 1)) if won else -stake
-                        bankroll += profit
-                        
-                        pct_return = profit / max(bankroll - profit, 1)
-                        returns.append(pct_return)
-                        market_returns[market].append(pct_return)
-                        
-                        history.append({
-                            'Window': window_idx,
-                            'Match': f"{home} vs {away}",
-                            'Market': market,
-                            'Odds': odds,
-                            'Model_Prob': round(model_prob, 3),
-                            'EV': round(val['ev'], 3),
-                            'Stake': round(stake, 2),
-                            'Result': 'WON' if won else 'LOST',
-                            'Profit': round(profit, 2),
-                            'Bankroll': round(bankroll, 2)
-                        })
-                        
-                        self.bankroll_mgr.bankroll = bankroll  # Sync
-        
-        # Calculate overall Sharpe
-        sharpe = self._calculate_sharpe(returns)
+            # Value cells in row/market order (the order the bankroll walks them); Kelly only for these
+            r, c = np.nonzero(bet_mask)
+            cells = bets[n_bets:n_bets + len(r)]
+            cells["window"], cells["row"], cells["market"] = window_idx, rows.start + r, c
+            cells["prob"], cells["ev"] = probs[r, c], ev[r, c]
+            # Half Kelly fractions, clipped to the manager's max stake
+            cells["stake_frac"] = kelly(odds[r, c], probs[r, c])
+            n_bets += len(r)
+        
+        # Bankroll is path-dependent: one sequential replay over every value cell of the run
+        bets = bets[:n_bets]
+        row, mkt = bets["row"], bets["market"]
+        # Per-bet returns for the Sharpe calculation, written by the replay: row 0 = all bets,
+        # row j+1 = market j (NaN-padded)
+        R = np.full((len(MARKETS) + 1, n_bets), np.nan, dtype=np.float32)
+        stakes, profits, bankrolls, bankroll = _replay_bankroll(
+            bets["stake_frac"], odds_all[row, mkt], won_all[row, mkt], mkt, 1000.0, R
+        )
+        self.bankroll_mgr.bankroll = bankroll
+        placed = stakes > 0
+        bets, row, mkt = bets[placed], row[placed], mkt[placed]
+        stakes, profits, bankrolls = stakes[placed], profits[placed], bankrolls[placed]
+        
+        # Overall + per-market Sharpe in one pass
+        sharpes, means, counts = self._calculate_sharpe_matrix(R)
+        sharpe = sharpes[0]
         
         # Per-market Sharpe analysis
         market_analysis = {}
-        for market, rets in market_returns.items():
-            m_sharpe = self._calculate_sharpe(rets)
+        for j, market in enumerate(MARKETS):
+            m_sharpe = sharpes[j + 1]
             market_analysis[market] = {
                 "sharpe_ratio": round(m_sharpe, 3),
-                "total_bets": len(rets),
-                "avg_return": round(np.mean(rets) * 100, 2) if rets else 0,
+                "total_bets": int(counts[j + 1]),
+                "avg_return": round(means[j + 1] * 100, 2) if counts[j + 1] else 0,
                 "is_approved": m_sharpe > 2.0,  # ONLY show if Sharpe > 2.0
                 "status": "✅ APROBADO" if m_sharpe > 2.0 else "❌ RECHAZADO"
             }
         
-        results_df = pd.DataFrame(history) if history else pd.DataFrame()
+        results_df = pd.DataFrame({
+            'Window': bets["window"],
+            'Match': [f"{h} vs {a}" for h, a in zip(home_all[row], away_all[row])],
+            'Market': np.array(MARKETS)[mkt],
+            'Odds': np.round(odds_all[row, mkt], 2),
+            'Model_Prob': np.round(bets["prob"], 3),
+            'EV': np.round(bets["ev"], 3),
+            'Stake': np.round(stakes, 2),
+            'Result': np.where(won_all[row, mkt], 'WON', 'LOST'),
+            'Profit': np.round(profits, 2),
+            'Bankroll': np.round(bankrolls, 2)
+        }) if len(bets) else pd.DataFrame()
         
         return results_df, round(bankroll, 2), round(sharpe, 3), market_analysis
 
-    def _calculate_sharpe(self, returns, risk_free_rate=0.0):
+    def _calculate_sharpe_matrix(self, R, risk_free_rate=0.0):
         """
-        Sharpe Ratio = (Mean Return - Risk Free) / Std Dev of Returns
-        Annualized assuming ~250 trading days.
+        Row-wise Sharpe Ratio = (Mean Return - Risk Free) / Std Dev of Returns (population std),
+        annualized assuming daily bets (x sqrt(365)), over a NaN-padded (series, max_len) returns matrix.
+        Returns: (sharpes, means, counts); rows with < 2 returns or zero std get Sharpe 0.
         """
-        if not returns or len(returns) < 2:
-            return 0.0
-        
-        mean_ret = np.mean(returns)
-        std_ret = np.std(returns)
-        
-        if std_ret == 0:
-            return 0.0
-        
-        # Annualize (assuming daily bets, ~365 days)
-        sharpe = (mean_ret - risk_free_rate) / std_ret * np.sqrt(365)
-        
-        return sharpe
+        counts = np.count_nonzero(~np.isnan(R), axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'), warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN rows (markets without bets)
+            means = np.nanmean(R, axis=1, dtype=np.float64)
+            stds = np.nanstd(R, axis=1, dtype=np.float64)
+            sharpes = (means - risk_free_rate) / stds * np.sqrt(365)
+        sharpes = np.where((counts >= 2) & (stds > 0), sharpes, 0.0)
+        return sharpes, np.nan_to_num(means), counts
 
     def run_stress_test(self, n_simulations=50000):
         """
@@ -1,4 +1,5 @@
 import logging
+import numpy as np
 
 logger = logging.getLogger("BankrollManager")
 
@@ -19,7 +20,7 @@ class BankrollManager:
         p = Probabilidad de ganar (0 a 1).
         q = Probabilidad de perder (1 - p).
         """
-        if odds <= 1: return 0.0
+        if odds <= 1: return {"percentage": 0.0, "amount": 0.0, "raw_kelly": 0.0}
         
         b = odds - 1
         p = prob
@@ -27,13 +28,8 @@ class BankrollManager:
         
         fraction = (b * p - q) / b
         
-        # We use 'Kelly Fraction' adjustment (e.g. Quarter Kelly or Half Kelly)
-        # to be more conservative. Defaulting to Half Kelly (0.5).
-        kelly_fraction = 0.5
-        stake_pct = fraction * kelly_fraction
-        
-        # Apply safety limits
-        safe_stake_pct = max(0.0, min(stake_pct, self.max_stake_pct))
+        # Half Kelly + safety limits, same kernel as the array version
+        safe_stake_pct = float(self.calculate_kelly_fraction_array(odds, prob))
         stake_amount = self.bankroll * safe_stake_pct
         
         return {
@@ -42,6 +38,19 @@ class BankrollManager:
             "raw_kelly": round(fraction, 4)
         }
 
+    def calculate_kelly_fraction_array(self, odds, prob, kelly_fraction=0.5):
+        """
+        Vectorized Kelly: bankroll fractions for arrays of odds/probabilities (any matching shape).
+        We use 'Kelly Fraction' adjustment (e.g. Quarter Kelly or Half Kelly) to be more
+        conservative, defaulting to Half Kelly (0.5), then clip to [0, max_stake_pct].
+        Odds <= 1 or NaN give 0.
+        """
+        odds = np.asarray(odds, dtype=float)
+        prob = np.asarray(prob, dtype=float)
+        b = np.where(odds > 1, odds - 1, np.nan)  # masked before the division
+        fraction = (b * prob - (1 - prob)) / b
+        return np.nan_to_num(np.clip(fraction * kelly_fraction, 0.0, self.max_stake_pct))
+
     def update_bankroll(self, pnl):
         self.bankroll += pnl
         logger.info(f"Bankroll updated: {self.bankroll}")
@@ -1,29 +1,96 @@
 import json
 import os
 import time
-import pandas as pd
 from datetime import datetime
+# Optional C JSON codec (much faster than json.dump(indent=4) on a long history); same format either way
+try:
+    from orjson import loads as _loads, dumps as _orjson_dumps
+except ImportError:
+    _loads, _orjson_dumps = json.loads, None
+
+# Appended mutations before the log is folded back into the JSON snapshot
+LOG_COMPACT_EVERY = 500
+
+def _dumps(obj, pretty=False):
+    """Compact UTF-8 JSON bytes (indented only when `pretty`, for hand inspection)."""
+    if pretty:
+        return json.dumps(obj, indent=4).encode()
+    if _orjson_dumps is not None:
+        return _orjson_dumps(obj)
+    return json.dumps(obj, separators=(',', ':')).encode()
 
 class BetTracker:
     def __init__(self, file_path='data/bet_history.json'):
         self.file_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), file_path)
+        # Append-only mutation log next to the snapshot: one JSON op per line
+        self.log_path = os.path.splitext(self.file_path)[0] + '.jsonl'
+        self._log_len = 0
         self.history = self.load_history()
+        self._dirty = self._log_len > 0  # history differs from the snapshot on disk
+        self._by_id = {bet['id']: bet for bet in self.history}
+        self._stats = None  # get_stats() result, dropped on every history mutation
+        self._last_id = max(self._by_id, default=0)
         # Active slip (in-memory only, for building parleys in UI)
         self.slip = [] 
 
     def load_history(self):
-        if not os.path.exists(self.file_path):
-            return []
-        try:
-            with open(self.file_path, 'r') as f:
-                return json.load(f)
-        except:
-            return []
+        history = []
+        if os.path.exists(self.file_path):
+            try:
+                with open(self.file_path, 'rb') as f:
+                    history = _loads(f.read())
+            except:
+                history = []
+        # Replay mutations written since the last snapshot (idempotent: a crash
+        # between snapshot and log truncation must not duplicate bets)
+        if os.path.exists(self.log_path):
+            by_id = {bet['id']: bet for bet in history}
+            with open(self.log_path, 'rb') as f:
+                for line in f:
+                    try:
+                        op = _loads(line)
+                    except ValueError:
+                        continue  # torn last line after a crash
+                    self._log_len += 1
+                    if op['op'] == 'add' and op['bet']['id'] not in by_id:
+                        history.append(op['bet'])
+                        by_id[op['bet']['id']] = op['bet']
+                    elif op['op'] == 'result' and op['id'] in by_id:
+                        by_id[op['id']].update(status=op['status'], **{'return': op['return']})
+        return history
 
-    def save_history(self):
+    def save_history(self, pretty=False, force=False):
+        """
+        Writes the full snapshot (compact unless `pretty`) and truncates the mutation log.
+        No-op when nothing changed since the last snapshot, unless `force`.
+        """
+        if not (self._dirty or force):
+            return
         os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
-        with open(self.file_path, 'w') as f:
-            json.dump(self.history, f, indent=4)
+        # One write to a temp file + atomic rename: a crash never leaves a half-written snapshot
+        tmp = f"{self.file_path}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(_dumps(self.history, pretty))
+        os.replace(tmp, self.file_path)
+        self._dirty = False
+        if os.path.exists(self.log_path):
+            os.remove(self.log_path)
+        self._log_len = 0
+
+    def _append_log(self, ops):
+        """O(1) persistence: appends the ops instead of re-serializing the whole history."""
+        os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
+        with open(self.log_path, 'ab') as f:
+            f.write(b''.join(_dumps(op) + b'\n' for op in ops))
+        self._log_len += len(ops)
+        self._dirty = True
+        if self._log_len >= LOG_COMPACT_EVERY:
+            self.save_history()
+
+    def _new_id(self):
+        """Nanosecond timestamp id, bumped past the last one so ids stay unique on coarse clocks."""
+        self._last_id = max(time.time_ns(), self._last_id + 1)
+        return self._last_id
 
     def add_to_slip(self, match, selection, odds, fair_prob, stake=10, type="Single"):
         """
@@ -31,7 +98,7 @@ class BetTracker:
         match: "Real Madrid vs Barcelona"
         """
         bet = {
-            "id": int(time.time() * 1000), # Simple ID
+            "id": self._new_id(),
             "date": datetime.now().strftime("%Y-%m-%d %H:%M"),
             "match": match,
             "selection": selection,
@@ -52,7 +119,9 @@ class BetTracker:
         """Saves all bets in slip as individual bets."""
         for bet in self.slip:
             self.history.append(bet)
-        self.save_history()
+            self._by_id[bet['id']] = bet
+        self._append_log([{"op": "add", "bet": bet} for bet in self.slip])
+        self._stats = None
         self.clear_slip()
 
     def confirm_slip_as_parley(self, stake=10):
@@ -71,7 +140,7 @@ class BetTracker:
             selections.append(f"{bet['selection']} ({bet['match']})")
         
         parley_bet = {
-            "id": int(time.time() * 1000),
+            "id": self._new_id(),
             "date": datetime.now().strftime("%Y-%m-%d %H:%M"),
             "match": " + ".join(matches[:2]) + ("..." if len(matches) > 2 else ""), 
             "selection": "PARLEY: " + " | ".join(selections),
@@ -85,42 +154,52 @@ class BetTracker:
         }
         
         self.history.append(parley_bet)
-        self.save_history()
+        self._by_id[parley_bet['id']] = parley_bet
+        self._append_log([{"op": "add", "bet": parley_bet}])
+        self._stats = None
         self.clear_slip()
 
     def update_result(self, bet_id, result):
         """result: 'WON' or 'LOST'"""
-        for bet in self.history:
-            if bet['id'] == bet_id:
-                bet['status'] = result
-                if result == 'WON':
-                    bet['return'] = bet['stake'] * bet['odds']
-                else:
-                    bet['return'] = 0
-                break
-        self.save_history()
+        bet = self._by_id.get(bet_id)
+        if bet is None: return
+        bet['status'] = result
+        if result == 'WON':
+            bet['return'] = bet['stake'] * bet['odds']
+        else:
+            bet['return'] = 0
+        self._append_log([{"op": "result", "id": bet_id, "status": result, "return": bet['return']}])
+        self._stats = None
 
     def get_stats(self):
-        df = pd.DataFrame(self.history)
-        if df.empty:
+        if self._stats is None:
+            self._stats = self._compute_stats()
+        return dict(self._stats)
+
+    def _compute_stats(self):
+        """Single pass over the history, no DataFrame."""
+        if not self.history:
             return {"roi": 0, "profit": 0, "win_rate": 0, "count": 0}
         
-        resolved = df[df['status'] != 'PENDING']
-        if resolved.empty:
-            return {"roi": 0, "profit": 0, "win_rate": 0, "count": len(df)}
+        total_stake = total_return = 0.0
+        wins = resolved = 0
+        for bet in self.history:
+            if bet['status'] == 'PENDING': continue
+            total_stake += bet['stake']
+            total_return += bet['return']
+            wins += bet['status'] == 'WON'
+            resolved += 1
+        if not resolved:
+            return {"roi": 0, "profit": 0, "win_rate": 0, "count": len(self.history)}
         
-        total_stake = resolved['stake'].sum()
-        total_return = resolved['return'].sum()
         profit = total_return - total_stake
         roi = (profit / total_stake) * 100 if total_stake > 0 else 0
-        
-        wins = len(resolved[resolved['status'] == 'WON'])
-        win_rate = (wins / len(resolved)) * 100
+        win_rate = (wins / resolved) * 100
         
         return {
             "roi": roi,
             "profit": profit,
             "win_rate": win_rate,
-            "count": len(df),
-            "resolved_count": len(resolved)
+            "count": len(self.history),
+            "resolved_count": resolved
         }
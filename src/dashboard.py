@@ -4,6 +4,15 @@ import numpy as np
 import plotly.graph_objects as go
 import plotly.express as px
 import time
+import math
+import re
+import atexit
+import functools
+import requests
+from requests.adapters import HTTPAdapter
+import importlib
+import itertools
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import os
 import sys
@@ -11,46 +20,114 @@ import sys
 # Ensure src is in path
 sys.path.append(os.path.join(os.getcwd(), 'src'))
 
+# Stand-ins used when a module can't be imported (missing optional deps); None = feature disabled
+class _StubPredictionEngine:
+    def calculate_poisson_probability(self, h, a): return {"1": 0.5, "X": 0.25, "2": 0.25}
+    def calculate_poisson_probability_many(self, h, a): return {"1": np.full(len(h), 0.5), "X": np.full(len(h), 0.25), "2": np.full(len(h), 0.25)}
+class _StubBankrollManager:
+    def __init__(self, b): self.bankroll = b
+class _StubScraper365: pass
+class _StubAutoBetManager:
+    def close(self): pass
+
+_STUBS = {
+    "PredictionEngine": _StubPredictionEngine,
+    "BankrollManager": _StubBankrollManager,
+    "Scraper365": _StubScraper365,
+    "AutoBetManager": _StubAutoBetManager,
+    "_name_tokens": lambda name: frozenset(),  # matcher unavailable: nothing matches
+    "_jaccard": lambda a, b: 0.0,
+    "MATCH_THRESHOLD": 0.5,
+    "frac_to_decimal": lambda frac_str: math.nan,  # no parser: every price reads as unavailable
+}
+
+@functools.lru_cache(maxsize=None)
+def _imp(modname, attr):
+    """`attr` from src/`modname` (run from src/ or the repo root), else its stub when the import fails."""
+    for path in (modname, f"src.{modname}"):
+        try:
+            module = importlib.import_module(path)
+        except ImportError:
+            continue
+        return getattr(module, attr)  # any other error is a real bug: let it surface
+    return _STUBS.get(attr)
+
 # Import Custom Modules
-try:
-    from main_engine import PredictionEngine
-    from bankroll import BankrollManager
-    from scraper_365 import Scraper365
-except ImportError:
-    try:
-        from src.main_engine import PredictionEngine
-        from src.bankroll import BankrollManager
-        from src.scraper_365 import Scraper365
-    except ImportError:
-        class PredictionEngine: 
-            def calculate_poisson_probability(self, h, a): return {"1": 0.5, "X": 0.25, "2": 0.25}
-        class BankrollManager: 
-            def __init__(self, b): self.bankroll = b
-        class Scraper365: pass
+PredictionEngine = _imp("main_engine", "PredictionEngine")
+BankrollManager = _imp("bankroll", "BankrollManager")
+Scraper365 = _imp("scraper_365", "Scraper365")
 
 # Import Omniscience Modules
-try:
-    from rl_engine import RLEngine, build_anonymous_features
-    from odds_api import OddsClient
-    from weather_api import WeatherClient
-    OMNISCIENCE_LOADED = True
-except Exception:
-    try:
-        from src.rl_engine import RLEngine, build_anonymous_features
-        from src.odds_api import OddsClient
-        from src.weather_api import WeatherClient
-        OMNISCIENCE_LOADED = True
-    except Exception:
-        OMNISCIENCE_LOADED = False
+RLEngine = _imp("rl_engine", "RLEngine")
+OddsClient = _imp("odds_api", "OddsClient")
+WeatherClient = _imp("weather_api", "WeatherClient")
+OMNISCIENCE_LOADED = None not in (RLEngine, OddsClient, WeatherClient)
+
+# Partial reruns (Streamlit >= 1.37; experimental_fragment before that, plain call on older versions)
+_fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None) or (lambda fn: fn)
+
+# Dixon-Coles model for the live tracker (stateless: one shared instance); falls back to plain Poisson
+DixonColesModel = _imp("dixon_coles", "DixonColesModel")
+_DC = DixonColesModel() if DixonColesModel else None
 
 # Import Auto-Bet Manager
+AutoBetManager = _imp("auto_bet_manager", "AutoBetManager")
+# Team-name matcher shared with auto-bet, so a fixture pairs with the same SofaScore event everywhere
+name_tokens = _imp("auto_bet_manager", "_name_tokens")
+jaccard = _imp("auto_bet_manager", "_jaccard")
+MATCH_THRESHOLD = _imp("auto_bet_manager", "MATCH_THRESHOLD")
+
+# Memoized fractional -> decimal odds parser (lives in an imported module, so the memo outlives reruns)
+frac_to_decimal = _imp("sofa_odds", "frac_to_decimal")
+
+# Request headers for the Probability Gap scrapers (built once, passed by reference)
+SOFA_HEADERS = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
+S365_HEADERS = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+                'Origin': 'https://www.365scores.com', 'Referer': 'https://www.365scores.com/'}
+
+# Competitions pre-selected in the Probability Gap league filter (substring match, case-insensitive)
+TOP_LEAGUES = ['LaLiga', 'Premier League', 'Bundesliga', 'Serie A', 'Ligue 1',
+               'Champions League', 'Europa League', 'Conference League',
+               'LaLiga Hypermotion', 'Copa del Rey']
+TOP_LEAGUES_RE = re.compile('|'.join(re.escape(tl.lower()) for tl in TOP_LEAGUES))
+
+# Disk-backed copy of the page caches: survives redeploys / cold workers (st.cache_data is per process)
 try:
-    from auto_bet_manager import AutoBetManager
+    import disk_cache
 except ImportError:
-    try:
-        from src.auto_bet_manager import AutoBetManager
-    except ImportError:
-        class AutoBetManager: pass
+    from src import disk_cache
+PAGE_CACHE_TTL = 600  # same as the st.cache_data TTLs below
+
+# st.caption look-alike for text fused into a larger st.markdown call (one delta instead of two)
+CAPTION_HTML = "<span style='font-size:0.875rem;opacity:0.6'>{}</span>"
+
+# Value heatmap axes and colours (CONTROL TOTAL tab), fixed across reruns
+HEATMAP_LEAGUES = ("La Liga", "Premier League", "Bundesliga", "Serie A", "Ligue 1", "Eredivisie", "Liga Portugal")
+HEATMAP_MARKETS = ("1X2 (1)", "1X2 (X)", "1X2 (2)", "Over 2.5", "BTTS", "Corners >9.5")
+HEATMAP_COLORSCALE = (
+    (0, '#1a1a2e'),      # Deep blue (trap)
+    (0.3, '#16213e'),    # Dark blue
+    (0.5, '#0f3460'),    # Neutral
+    (0.7, '#e94560'),    # Red (moderate value)
+    (1.0, '#ff6b6b'),    # Bright red (high value!)
+)
+
+# Layout shared by every Probability Gap bar chart (plotly copies it into each figure)
+GAP_LAYOUT = dict(
+    template="plotly_dark", barmode='group',
+    height=280, margin=dict(t=30, b=30),
+    paper_bgcolor='#0d1b2a', plot_bgcolor='#1b263b',
+    legend=dict(orientation="h", yanchor="bottom", y=1.02),
+    yaxis=dict(tickformat=".0%", range=[0, 1])
+)
+
+# Implied odds from a community vote share v (0-100%): 1 / (v/100 + 5% margin), one entry per integer percentage
+_ODDS_LUT = np.round(1.0 / (np.arange(101) / 100 + 0.05), 2)
+
+def _community_odds(comm):
+    """1X2 implied odds for a get_game_predictions() payload, looked up instead of recomputed per game."""
+    return {k: float(_ODDS_LUT[min(max(int(round(comm.get(k, d))), 0), 100)])
+            for k, d in (("1", 50), ("X", 30), ("2", 20))}
 
 
 # --- PAGE CONFIG ---
@@ -62,7 +139,8 @@ st.set_page_config(
 )
 
 # --- CUSTOM CSS (BET365 AESTHETIC) ---
-st.markdown("""
+# Re-emitted on every rerun (Streamlit drops elements a rerun doesn't write), but built only once
+_CSS = """
 <style>
     /* Main Background */
     .stApp {
@@ -100,9 +178,11 @@ st.markdown("""
         color: #00FFCC !important;
     }
 </style>
-""", unsafe_allow_html=True)
+"""
+st.markdown(_CSS, unsafe_allow_html=True)
 
 # --- INITIALIZATION ---
+TODAY = datetime.now().strftime("%d/%m/%Y")  # dd/mm/yyyy, the 365Scores date format
 engine = PredictionEngine()
 v_bankroll = 1000.0
 bank_manager = BankrollManager(v_bankroll)
@@ -143,97 +223,100 @@ if menu == "RASTREADOR EN VIVO":
             *   Carga el partido en el **ANALIZADOR H2H** para ver si hay lesionados o fatiga.
         """)
     
-    today_str = datetime.now().strftime("%d/%m/%Y")
-    
     # 1. Search & Filter Bar
     search_query = st.text_input("🔍 Buscar partido o liga...", "").lower()
     
-    today_str = datetime.now().strftime("%d/%m/%Y")
-    
     # 1. Fetch Real Games with Caching
     @st.cache_data(ttl=600)
     def fetch_games(date):
-        return scraper.get_games(date)
-
-    @st.cache_data(ttl=3600) # Cache team stats for 1 hour
-    def get_team_mu(team_id):
-        results = scraper.get_team_results(team_id)
-        if not results: return 1.5
-        
-        goals = []
-        for rid in results[:5]: # Last 5 games
-            rd = scraper.get_game_details(rid)
-            if rd:
-                home = rd['game']['homeCompetitor']
-                away = rd['game']['awayCompetitor']
-                score = home['score'] if home['id'] == team_id else away['score']
-                goals.append(score)
-        
-        return sum(goals) / len(goals) if goals else 1.5
+        games = disk_cache.get("live_games", date, PAGE_CACHE_TTL)
+        if games is None:
+            games = scraper.get_games(date)
+            if games: disk_cache.put("live_games", date, games)
+        # Lowercased (home, away, league) per game, built once per fetch for the search filter
+        names = np.array([
+            (g.get('homeCompetitor', {}).get('name', '').lower(),
+             g.get('awayCompetitor', {}).get('name', '').lower(),
+             g.get('competitionDisplayName', '').lower())
+            for g in games
+        ], dtype=str).reshape(-1, 3)
+        return games, names
 
-    raw_games = fetch_games(today_str)
+    raw_games, game_names = fetch_games(TODAY)
     
     if search_query:
-        raw_games = [g for g in raw_games if 
-                     search_query in g.get('homeCompetitor', {}).get('name', '').lower() or 
-                     search_query in g.get('awayCompetitor', {}).get('name', '').lower() or
-                     search_query in g.get('competitionDisplayName', '').lower()]
+        # One vectorized substring pass over all three name columns
+        match = (np.char.find(game_names, search_query) >= 0).any(axis=1)
+        raw_games = [raw_games[i] for i in np.flatnonzero(match)]
 
     if not raw_games:
         st.warning(f"No se encontraron partidos para '{search_query}' o no hay partidos hoy.")
     else:
         st.success(f"Encontrados {len(raw_games)} partidos. Calculando probabilidades reales Dixon-Coles...")
         
-        # Limit to 30 games to avoid UI lag
-        for g in raw_games[:30]:
-            try:
-                # Basic Mapping
-                h_comp = g.get('homeCompetitor', {})
-                a_comp = g.get('awayCompetitor', {})
-                home_team = h_comp.get('name', 'Home')
-                away_team = a_comp.get('name', 'Away')
-                game_id = g.get('id')
-                status = g.get('statusText', 'Scheduled')
-                
-                # Probs Logic - REAL DATA
-                h_mu = get_team_mu(h_comp.get('id'))
-                a_mu = get_team_mu(a_comp.get('id'))
-                
-                try:
-                    from dixon_coles import DixonColesModel
-                    dm = DixonColesModel()
-                    probs_ia = dm.calculate_match_probabilities(h_mu, a_mu)
-                except Exception:
-                    probs_ia = engine.calculate_poisson_probability(h_mu, a_mu)
-                
-                with st.container():
-                    c1, c2, c3, c4 = st.columns([3, 3, 2, 1])
-                    with c1:
-                        st.markdown(f"**{home_team} vs {away_team}**")
-                        st.caption(f"{status} | ID: {game_id}")
-                    
-                    with c2:
-                        # Simple Prob Grid
-                        o1, oX, o2 = st.columns(3)
-                        o1.metric("H", f"{int(probs_ia['1']*100)}%")
-                        oX.metric("X", f"{int(probs_ia['X']*100)}%")
-                        o2.metric("A", f"{int(probs_ia['2']*100)}%")
+        # Paginate instead of rendering every card: only one page of games is modelled and rendered per rerun
+        LIVE_PAGE_SIZE = 10
+        n_pages = math.ceil(len(raw_games) / LIVE_PAGE_SIZE)
+        page = st.number_input("Página", min_value=1, max_value=n_pages, value=1, key="live_page") if n_pages > 1 else 1
+        shown_games = raw_games[(page - 1) * LIVE_PAGE_SIZE:page * LIVE_PAGE_SIZE]
+        # One bulk call per page; team stats are memoized for 1 hour inside the scraper
+        try:
+            team_mus = scraper.get_teams_mu_bulk(
+                [c.get('id') for g in shown_games for c in (g.get('homeCompetitor', {}), g.get('awayCompetitor', {}))],
+                n_last=5 # Last 5 games
+            )
+        except Exception as e:
+            st.warning(f"⚠️ Estadísticas de equipos no disponibles ({e}); usando media por defecto.")
+            team_mus = {}  # every team falls back to 1.5 below
+        
+        # Probs Logic - REAL DATA: one vectorized Dixon-Coles pass over every shown game
+        h_mus = [team_mus.get(g.get('homeCompetitor', {}).get('id'), 1.5) for g in shown_games]
+        a_mus = [team_mus.get(g.get('awayCompetitor', {}).get('id'), 1.5) for g in shown_games]
+        if _DC is not None:
+            probs_all = _DC.calculate_match_probabilities_many(h_mus, a_mus)
+        else:
+            probs_all = engine.calculate_poisson_probability_many(h_mus, a_mus)
+        
+        def render_game_card(g, probs_ia):
+            """One game row: teams/status, H/X/A grid, community votes, analyzer shortcut."""
+            h_comp = g.get('homeCompetitor', {})
+            a_comp = g.get('awayCompetitor', {})
+            home_team = h_comp.get('name', 'Home')
+            away_team = a_comp.get('name', 'Away')
+            game_id = g.get('id')
+            status = g.get('statusText', 'Scheduled')
+            
+            c1, c2, c3, c4 = st.columns([3, 3, 2, 1])
+            with c1:
+                st.markdown(f"**{home_team} vs {away_team}**")
+                st.caption(f"{status} | ID: {game_id}")
+            
+            with c2:
+                # Simple Prob Grid
+                o1, oX, o2 = st.columns(3)
+                o1.metric("H", f"{int(probs_ia['1']*100)}%")
+                oX.metric("X", f"{int(probs_ia['X']*100)}%")
+                o2.metric("A", f"{int(probs_ia['2']*100)}%")
+            
+            with c3:
+                # Lazy load community prediction to avoid one API call per game
+                if st.button("Ver Comunidad", key=f"comm_{game_id}"):
+                    comm = scraper.get_game_predictions(game_id)
+                    st.json(comm)
+                else:
+                    st.caption("Ver Votos")
                     
-                    with c3:
-                        # Lazy load community prediction to avoid 30 sequential API calls
-                        if st.button("Ver Comunidad", key=f"comm_{game_id}"):
-                            comm = scraper.get_game_predictions(game_id)
-                            st.json(comm)
-                        else:
-                            st.caption("Ver Votos")
-                            
-                    with c4:
-                        if st.button("🔍", key=f"ana_{game_id}"):
-                            st.session_state.selected_game = game_id
-                            st.session_state.selected_home = home_team
-                            st.session_state.selected_away = away_team
-                            st.rerun()
-                st.divider()
+            with c4:
+                if st.button("🔍", key=f"ana_{game_id}"):
+                    st.session_state.selected_game = game_id
+                    st.session_state.selected_home = home_team
+                    st.session_state.selected_away = away_team
+                    st.rerun()
+            st.divider()
+        
+        for i, g in enumerate(shown_games):
+            try:
+                render_game_card(g, {k: float(v[i]) for k, v in probs_all.items()})
             except Exception as e:
                 st.error(f"Error rendering game {g.get('id')}: {e}")
                 continue
@@ -253,54 +336,39 @@ elif menu == "VALUE PICKS (TOP)":
         *   ⚠️ **VOLÁTIL**: Ligas menores (U21, Reservas) donde los datos son menos fiables. **Reduce tu apuesta (Stake bajo).**
         """)
     
-    today_str = datetime.now().strftime("%d/%m/%Y")
+    # Scan more games (60) but with faster mu calculation
+    PICKS_SCAN_LIMIT = 60
+    VOLATILE_LEAGUE_TAGS = ("u19", "u20", "u21", "u23", "reserve", "reserva", "women", "femenin")
     
-    # 1. Fetch Real Games with Caching
+    # 1. Fetch Real Games + team goal averages in one cached batch
+    # Optimized Mu with less history for the quick scanner (3 games instead of 5)
     @st.cache_data(ttl=600)
     def fetch_games_for_picks(date):
-        return scraper.get_games(date)
+        return scraper.get_games_full(date, n_last=3, limit=PICKS_SCAN_LIMIT)
 
-    raw_games = fetch_games_for_picks(today_str)
-    
-    # User Control for Confidence level
-    min_vts = st.slider("🔍 Filtro de Confianza (Votos mínimos)", 0, 500, 80, 
-                        help="Baja este valor a 0 si quieres ver todos los partidos, incluso los de ligas menores.")
-    
-    if not raw_games:
-        st.warning("No hay partidos disponibles para analizar hoy.")
-    else:
-        # Optimized Mu with less history for the quick scanner (3 games instead of 5)
-        @st.cache_data(ttl=3600)
-        def get_team_mu_fast(team_id):
-            results = scraper.get_team_results(team_id)
-            if not results: return 1.5
-            goals = []
-            for rid in results[:3]: # Scan only 3 games for speed
-                rd = scraper.get_game_details(rid)
-                if rd:
-                    h = rd['game']['homeCompetitor']
-                    a = rd['game']['awayCompetitor']
-                    goals.append(h['score'] if h['id'] == team_id else a['score'])
-            return sum(goals) / len(goals) if goals else 1.5
+    # 2. Every pick of the day regardless of the confidence filter (cached; the slider only filters)
+    @st.cache_data(ttl=600, show_spinner="Analizando partidos...")
+    def build_all_picks(date, scan_limit):
+        """(number of games scanned, pick columns); read from the disk cache when another worker built them."""
+        cache_key = f"{date}_{scan_limit}"
+        hit = disk_cache.get("picks", cache_key, PAGE_CACHE_TTL)
+        if hit is not None:
+            return hit["n_games"], hit["picks"]
 
-        picks = []
-        status_text = st.empty()
-        progress_bar = st.progress(0)
-        
-        # Scan more games (60) but with faster mu calculation
-        scan_limit = min(60, len(raw_games))
+        raw_games, team_mus = fetch_games_for_picks(date)
+        # Picks as parallel columns (one list per DataFrame column + the numeric sort key and votes)
+        picks = {"match": [], "sel": [], "conf": [], "edge": [], "market": [], "sort": [], "votes": []}
+        scan = raw_games[:scan_limit]
+        # Poisson 1X2 for the whole scan in one vectorized call
+        picks_probs = engine.calculate_poisson_probability_many(
+            [team_mus.get(g.get('homeCompetitor', {}).get('id'), 1.5) for g in scan],
+            [team_mus.get(g.get('awayCompetitor', {}).get('id'), 1.5) for g in scan],
+        )
         
-        for i, g in enumerate(raw_games[:scan_limit]):
-            h_name = g.get('homeCompetitor', {}).get('name', 'Home')
-            a_name = g.get('awayCompetitor', {}).get('name', 'Away')
-            status_text.text(f"Analizando: {h_name} vs {a_name}...")
-            progress_bar.progress((i+1)/scan_limit)
-            
+        for i, g in enumerate(scan):
             try:
                 # Calculate Probs
-                h_mu = get_team_mu_fast(g['homeCompetitor']['id'])
-                a_mu = get_team_mu_fast(g['awayCompetitor']['id'])
-                probs_ia = engine.calculate_poisson_probability(h_mu, a_mu)
+                probs_ia = {k: float(v[i]) for k, v in picks_probs.items()}
 
                 # Fetch Community Votes with Confidence
                 comm = scraper.get_game_predictions(g['id'])
@@ -319,119 +387,103 @@ elif menu == "VALUE PICKS (TOP)":
                 else:
                     # Implied Odds from Community: 1 / (Vote% + Margin)
                     if comm and comm.get('totalVotes', 0) > 0:
-                        curr_odds = {
-                            "1": round(1 / (comm.get('1', 50)/100 + 0.05), 2),
-                            "X": round(1 / (comm.get('X', 30)/100 + 0.05), 2),
-                            "2": round(1 / (comm.get('2', 20)/100 + 0.05), 2)
-                        }
+                        curr_odds = _community_odds(comm)
 
                 # Use the enhanced Engine Logic
                 if curr_odds:
                     analysis = engine.detect_edge(probs_ia, curr_odds)
                 else:
-                    analysis = {}
+                    continue
 
-                if comm and comm.get('totalVotes', 0) >= min_vts: # DYNAMIC FILTER
-                    # Basic Mapping
-                    home_team = g.get('homeCompetitor', {}).get('name', 'Home')
-                    away_team = g.get('awayCompetitor', {}).get('name', 'Away')
+                # Basic Mapping
+                home_team = g.get('homeCompetitor', {}).get('name', 'Home')
+                away_team = g.get('awayCompetitor', {}).get('name', 'Away')
+                # Minor leagues (U21, Reserves, Women...) have less reliable data
+                league = g.get('competitionDisplayName', '').lower()
+                volatility = "HIGH" if any(tag in league for tag in VOLATILE_LEAGUE_TAGS) else "NORMAL"
+                
+                # Check Home and Away Edge
+                for side, team in (("1", home_team), ("2", away_team)):
+                    if side not in analysis:
+                        continue
+                    res = analysis[side]
+                    status = res.get("market_status", "NORMAL")
+                    edge_val = res.get("value", 0)
+                    
+                    if status == "RED_TRAP":
+                        edge, market, sort_val = "TRAMPA ⛔", "⛔ TRAMPA FAVORITO", -999 # Sink to bottom
+                    elif status == "GOLD_GLITCH":
+                        edge, market, sort_val = f"💎 +{int(edge_val*100)}%", "💎 FALLO DE MERCADO", 999
+                    elif edge_val > 0.12: # Standard Value
+                        edge, market, sort_val = f"+{int(edge_val*100)}%", "🔥 VALOR" if volatility == "NORMAL" else "⚠️ VOLÁTIL", edge_val
+                    else:
+                        continue
+                    picks["match"].append(f"{home_team} vs {away_team}")
+                    picks["sel"].append(f"{side} ({team})")
+                    picks["conf"].append(f"{comm.get('totalVotes')} vts")
+                    picks["edge"].append(edge)
+                    picks["market"].append(market)
+                    picks["sort"].append(sort_val)
+                    picks["votes"].append(comm.get('totalVotes', 0))
                     
-                    # Check Home Edge
-                    if "1" in analysis:
-                        res = analysis["1"]
-                        status = res.get("market_status", "NORMAL")
-                        edge_val = res.get("value", 0)
-                        
-                        if status == "RED_TRAP":
-                            picks.append({
-                                "Match": f"{home_team} vs {away_team}",
-                                "Pick": f"1 ({home_team})",
-                                "Conf.": f"{comm.get('totalVotes')} vts",
-                                "Edge": "TRAMPA ⛔",
-                                "Market": "⛔ TRAMPA FAVORITO",
-                                "_edge_val": -999 # Sink to bottom or top? User wants highlighted.
-                            })
-                        elif status == "GOLD_GLITCH":
-                            picks.append({
-                                "Match": f"{home_team} vs {away_team}",
-                                "Pick": f"1 ({home_team})",
-                                "Conf.": f"{comm.get('totalVotes')} vts",
-                                "Edge": f"💎 +{int(edge_val*100)}%",
-                                "Market": "💎 FALLO DE MERCADO",
-                                "_edge_val": 999
-                            })
-                        elif edge_val > 0.12: # Standard Value
-                             picks.append({
-                                "Match": f"{home_team} vs {away_team}",
-                                "Pick": f"1 ({home_team})",
-                                "Conf.": f"{comm.get('totalVotes')} vts",
-                                "Edge": f"+{int(edge_val*100)}%",
-                                "Market": "🔥 VALOR" if volatility == "NORMAL" else "⚠️ VOLÁTIL",
-                                "_edge_val": edge_val
-                            })
-
-                    # Check Away Edge (simplified duplicate logic)
-                    if "2" in analysis:
-                        res = analysis["2"]
-                        status = res.get("market_status", "NORMAL")
-                        edge_val = res.get("value", 0)
-
-                        if status == "RED_TRAP":
-                            picks.append({
-                                "Match": f"{home_team} vs {away_team}",
-                                "Pick": f"2 ({away_team})",
-                                "Conf.": f"{comm.get('totalVotes')} vts",
-                                "Edge": "TRAMPA ⛔",
-                                "Market": "⛔ TRAMPA FAVORITO",
-                                "_edge_val": -999
-                            })
-                        elif status == "GOLD_GLITCH":
-                            picks.append({
-                                "Match": f"{home_team} vs {away_team}",
-                                "Pick": f"2 ({away_team})",
-                                "Conf.": f"{comm.get('totalVotes')} vts",
-                                "Edge": f"💎 +{int(edge_val*100)}%",
-                                "Market": "💎 FALLO DE MERCADO",
-                                "_edge_val": 999
-                            })
-                        elif edge_val > 0.12:
-                             picks.append({
-                                "Match": f"{home_team} vs {away_team}",
-                                "Pick": f"2 ({away_team})",
-                                "Conf.": f"{comm.get('totalVotes')} vts",
-                                "Edge": f"+{int(edge_val*100)}%",
-                                "Market": "🔥 VALOR" if volatility == "NORMAL" else "⚠️ VOLÁTIL",
-                                "_edge_val": edge_val
-                            })
-                            
             except Exception:
                 continue
+        if raw_games:
+            disk_cache.put("picks", cache_key, {"n_games": len(raw_games), "picks": picks})
+        return len(raw_games), picks
+
+    n_games, all_picks = build_all_picks(TODAY, PICKS_SCAN_LIMIT)
+    
+    # 3. Confidence filter + table as a fragment: moving the slider reruns only this block
+    @_fragment
+    def render_picks():
+        # User Control for Confidence level
+        min_vts = st.slider("🔍 Filtro de Confianza (Votos mínimos)", 0, 500, 80, 
+                            help="Baja este valor a 0 si quieres ver todos los partidos, incluso los de ligas menores.")
         
-        progress_bar.empty()
-        status_text.empty()
-        
-        if not picks:
+        keep = np.flatnonzero(np.asarray(all_picks["votes"], dtype=float) >= min_vts) # DYNAMIC FILTER
+        if not len(keep):
             st.info(f"No se han encontrado discrepancias con el filtro de {min_vts} votos. Prueba a bajar el filtro de confianza.")
-        else:
-            st.success(f"¡Se han detectado {len(picks)} oportunidades! (Incluyendo Trampas y Fallos de Mercado)")
-            
-            st.warning("Leyenda: 💎 = Fallo de Mercado (Apuesta obligatoria), ⛔ = Trampa de Favorito (EVIT A TODA COSTA), 🔥 = Valor Estándar")
+            return
+        
+        st.success(f"¡Se han detectado {len(keep)} oportunidades! (Incluyendo Trampas y Fallos de Mercado)")
+        
+        st.warning("Leyenda: 💎 = Fallo de Mercado (Apuesta obligatoria), ⛔ = Trampa de Favorito (EVIT A TODA COSTA), 🔥 = Valor Estándar")
 
-            # Create DataFrame, sort, and hide the raw value
-            df_picks = pd.DataFrame(picks).sort_values(by="_edge_val", ascending=False)
-            
-            # Apply styling to highlight Traps and Gold
-            st.dataframe(
-                df_picks.drop(columns=["_edge_val"]),
-                use_container_width=True,
-                hide_index=True
-            )
+        # Sort on the raw edge (descending) first, then build the DataFrame once from the columns
+        order = keep[np.argsort(-np.asarray(all_picks["sort"], dtype=float)[keep], kind="stable")]
+        df_picks = pd.DataFrame({
+            "Match": [all_picks["match"][j] for j in order],
+            "Pick": [all_picks["sel"][j] for j in order],
+            "Conf.": [all_picks["conf"][j] for j in order],
+            "Edge": [all_picks["edge"][j] for j in order],
+            "Market": [all_picks["market"][j] for j in order],
+        })
+        
+        # Apply styling to highlight Traps and Gold
+        st.dataframe(
+            df_picks,
+            use_container_width=True,
+            hide_index=True
+        )
+    
+    if not n_games:
+        st.warning("No hay partidos disponibles para analizar hoy.")
+    else:
+        render_picks()
 
 elif menu == "🤖 AUTO-BET & LEARN":
     st.header("🤖 AUTO-APRENDIZAJE Y APUESTAS")
     st.markdown("Este módulo permite a la IA **apostar sola**, verificar los resultados y **re-entrenarse** automáticamente.")
     
-    abm = AutoBetManager()
+    # One manager per process (HTTP session, RL model, DB handle), not a new one leaked on every rerun
+    @st.cache_resource
+    def auto_bet_manager():
+        manager = AutoBetManager()
+        atexit.register(manager.close)
+        return manager
+    
+    abm = auto_bet_manager()
     
     # DB Status Check
     db_status = "☁️ CLOUD (Postgres)" if getattr(abm.db, 'engine_type', 'postgres') == 'postgres' else "💾 OFFLINE (Local SQLite)"
@@ -458,6 +510,27 @@ elif menu == "🤖 AUTO-BET & LEARN":
         st.error(f"⚠️ Error conectando a Base de Datos: {e}")
         st.stop()
     
+    @st.cache_data(ttl=30)
+    def recent_bets_df(limit=20):
+        """Recent bets (Pending + Finished) as a display table; cleared whenever the buttons below add or settle bets."""
+        data = []
+        for p in abm.db.get_recent_bets(limit=limit):
+            # (bet_id, game_id, selection, odds, stake, status, h, a, pnl)
+            # p[5] is status, p[8] is pnl
+            status_icon = "⏳"
+            if p[5] == "WON": status_icon = "✅"
+            elif p[5] == "LOST": status_icon = "❌"
+            
+            data.append({
+                "Partido": f"{p[6]} vs {p[7]}",
+                "Selección": p[2],
+                "Cuota": f"{p[3]:.2f}",
+                "Stake": f"${p[4]:.2f}",
+                "Estado": f"{status_icon} {p[5]}",
+                "P/L": f"${p[8]:.2f}" if p[8] is not None else "$0.00"
+            })
+        return pd.DataFrame.from_records(data)
+    
     c1, c2 = st.columns(2)
     
     with c1:
@@ -470,12 +543,14 @@ elif menu == "🤖 AUTO-BET & LEARN":
         if st.button("🚀 EJECUTAR AUTO-BET (HOY)"):
             with st.spinner("Analizando mercado, partidos finalizados y calculando probabilidades..."):
                 count = abm.generate_daily_bets(confidence_threshold=threshold, max_bets=max_b)
+            recent_bets_df.clear()
             
             if count > 0:
                 st.success(f"¡Éxito! Se han procesado {count} apuestas (Nuevas + Finalizadas).")
                 # Auto-trigger learning for instant gratification
                 with st.spinner("Procesando resultados inmediatos..."):
                     res, lrn = abm.check_results_and_learn()
+                recent_bets_df.clear()
                 if lrn > 0:
                     st.success(f"✅ ¡Aprendizaje Instantáneo! La IA ha entrenado con {lrn} partidos finalizados de hoy.")
                 
@@ -491,6 +566,7 @@ elif menu == "🤖 AUTO-BET & LEARN":
         if st.button("🧠 VERIFICAR Y APRENDER"):
             with st.spinner("Conectando con resultados en vivo y re-entrenando modelo..."):
                 resolved, learned = abm.check_results_and_learn()
+            recent_bets_df.clear()
             
             if resolved > 0:
                 st.success(f"Se han resuelto {resolved} apuestas.")
@@ -502,26 +578,10 @@ elif menu == "🤖 AUTO-BET & LEARN":
 
     st.subheader("📝 Historial Reciente (Últimas 20)")
     
-    # Fetch recent for display (Pending + Finished)
-    recent = abm.db.get_recent_bets(limit=20)
-    if recent:
-        data = []
-        for p in recent:
-            # (bet_id, game_id, selection, odds, stake, status, h, a, pnl)
-            # p[5] is status, p[8] is pnl
-            status_icon = "⏳"
-            if p[5] == "WON": status_icon = "✅"
-            elif p[5] == "LOST": status_icon = "❌"
-            
-            data.append({
-                "Partido": f"{p[6]} vs {p[7]}",
-                "Selección": p[2],
-                "Cuota": f"{p[3]:.2f}",
-                "Stake": f"${p[4]:.2f}",
-                "Estado": f"{status_icon} {p[5]}",
-                "P/L": f"${p[8]:.2f}" if p[8] is not None else "$0.00"
-            })
-        st.table(pd.DataFrame(data))
+    # Fetch recent for display (Pending + Finished); st.dataframe virtualizes the rows
+    recent = recent_bets_df()
+    if not recent.empty:
+        st.dataframe(recent, hide_index=True, height=300, use_container_width=True)
     else:
         st.caption("No hay apuestas registradas todavía.")
 
@@ -531,7 +591,7 @@ elif menu == "SIMULADOR (Backtest)":
     
     try:
         from simulator import ValueSimulator
-        sim = ValueSimulator()
+        sim = ValueSimulator(iterations=10_000)
     except Exception:
         sim = None
 
@@ -546,9 +606,9 @@ elif menu == "SIMULADOR (Backtest)":
         if st.button("RUN MONTE CARLO"):
             with st.spinner("Simulando 10,000 caminos..."):
                 res = sim.run_monte_carlo(st_p_win/100, st_odds, st_stake/100)
-                st.success("Simulación Completa")
-                st.metric("PROB. RUINA", f"{res['prob_ruin']*100}%")
-                st.metric("EQUITY ESPERADA", f"${res['expected_bankroll']}")
+            st.success("Simulación Completa")
+            st.metric("PROB. RUINA", f"{res['prob_ruin']*100}%")
+            st.metric("EQUITY ESPERADA", f"${res['expected_bankroll']}")
 
     with col_b:
         # Mock historical data for comparison
@@ -703,47 +763,42 @@ elif menu == "🧠 CONTROL TOTAL (IA)":
         st.caption("Cuanto más rojo, mayor discrepancia entre la cuota real y la IA.")
         
         # Generate heatmap data (simulated from real engine calculations)
-        leagues_hm = ["La Liga", "Premier League", "Bundesliga", "Serie A", "Ligue 1", "Eredivisie", "Liga Portugal"]
-        markets_hm = ["1X2 (1)", "1X2 (X)", "1X2 (2)", "Over 2.5", "BTTS", "Corners >9.5"]
+        leagues_hm, markets_hm = HEATMAP_LEAGUES, HEATMAP_MARKETS
         
-        np.random.seed(int(datetime.now().timestamp()) % 1000)
-        # Value gaps: positive = value for bettor, negative = trap
-        heatmap_data = np.random.uniform(-0.15, 0.30, size=(len(leagues_hm), len(markets_hm)))
-        heatmap_data = np.round(heatmap_data, 3)
+        rng = np.random.default_rng(int(datetime.now().timestamp()) % 1000)
+        # Value gaps in thousandths (int16, -0.150..0.300): positive = value for bettor, negative = trap
+        heatmap_q = rng.integers(-150, 301, size=(len(leagues_hm), len(markets_hm)), dtype=np.int16)
         
-        fig_heat = go.Figure(data=go.Heatmap(
-            z=heatmap_data,
-            x=markets_hm,
-            y=leagues_hm,
-            colorscale=[
-                [0, '#1a1a2e'],      # Deep blue (trap)
-                [0.3, '#16213e'],    # Dark blue
-                [0.5, '#0f3460'],    # Neutral
-                [0.7, '#e94560'],    # Red (moderate value)
-                [1.0, '#ff6b6b'],    # Bright red (high value!)
-            ],
-            text=[[f"{v*100:.1f}%" for v in row] for row in heatmap_data],
-            texttemplate="%{text}",
-            textfont={"size": 14, "color": "white"},
-            hovertemplate="Liga: %{y}<br>Mercado: %{x}<br>Gap: %{text}<extra></extra>",
-            colorbar=dict(title="Value Gap %", tickformat=".0%")
-        ))
+        def heatmap_figure(q):
+            """Heatmap figure for a quantized (thousandths) league x market gap matrix."""
+            z = q / 1000.0
+            fig = go.Figure(data=go.Heatmap(
+                z=z,
+                x=HEATMAP_MARKETS,
+                y=HEATMAP_LEAGUES,
+                colorscale=HEATMAP_COLORSCALE,
+                text=[[f"{v*100:.1f}%" for v in row] for row in z],
+                texttemplate="%{text}",
+                textfont={"size": 14, "color": "white"},
+                hovertemplate="Liga: %{y}<br>Mercado: %{x}<br>Gap: %{text}<extra></extra>",
+                colorbar=dict(title="Value Gap %", tickformat=".0%")
+            ))
+            fig.update_layout(
+                template="plotly_dark",
+                title="Heatmap de Valor por Liga y Mercado",
+                height=450,
+                paper_bgcolor='#0d1b2a',
+                plot_bgcolor='#0d1b2a',
+            )
+            return fig
         
-        fig_heat.update_layout(
-            template="plotly_dark",
-            title="Heatmap de Valor por Liga y Mercado",
-            height=450,
-            paper_bgcolor='#0d1b2a',
-            plot_bgcolor='#0d1b2a',
-        )
-        st.plotly_chart(fig_heat, use_container_width=True)
+        st.plotly_chart(heatmap_figure(heatmap_q), use_container_width=True)
         
         # Identify Golden Opportunities from heatmap
-        golden_opportunities = []
-        for i, league in enumerate(leagues_hm):
-            for j, market in enumerate(markets_hm):
-                if heatmap_data[i][j] > 0.20:
-                    golden_opportunities.append({"Liga": league, "Mercado": market, "Gap": f"{heatmap_data[i][j]*100:.1f}%"})
+        golden_opportunities = [
+            {"Liga": leagues_hm[i], "Mercado": markets_hm[j], "Gap": f"{heatmap_q[i, j]/10:.1f}%"}
+            for i, j in np.argwhere(heatmap_q > 200)  # row-major, same order as a league x market scan
+        ]
         
         if golden_opportunities:
             st.markdown("### 💎 GOLDEN OPPORTUNITIES DETECTADAS")
@@ -758,33 +813,38 @@ elif menu == "🧠 CONTROL TOTAL (IA)":
         
         # ---- FECHA Y HORA ACTUAL ----
         from datetime import datetime, timedelta
-        import requests as req_lib
+        
+        # Concurrent requests when loading the displayed matches (4 endpoints x up to 15 matches)
+        GAP_FETCH_WORKERS = 16
+        # Disk-cache TTLs (s) per endpoint, shared across workers/restarts; when an upstream call
+        # fails, the last stored response is served instead of an empty result
+        ODDS_TTL, EVENTS_TTL, H2H_TTL, FORM_TTL, GAMES_TTL, PREDS_TTL = 60, 300, 86400, 3600, 300, 120
+        
+        # One keep-alive session for the tab, kept across reruns: warm TLS connections to SofaScore and
+        # 365Scores are reused by every render instead of being re-handshaken each time
+        @st.cache_resource
+        def gap_session():
+            session = requests.Session()
+            session.mount("https://", HTTPAdapter(pool_maxsize=GAP_FETCH_WORKERS))
+            session.verify = False
+            atexit.register(session.close)
+            return session
+        
+        gap_http = gap_session()
         
         now = datetime.now()
         st.markdown(f"### 🕐 Hoy: **{now.strftime('%d/%m/%Y — %H:%M')}h**")
         st.caption("Cuotas **REALES** de **SofaScore** + Predicciones de **365Scores** + IA Omniscience")
         st.markdown("---")
         
-        # ---- HELPER: Convert fractional odds to decimal ----
-        def frac_to_decimal(frac_str):
-            """Convert '9/4' to 3.25"""
-            try:
-                parts = frac_str.split('/')
-                if len(parts) == 2:
-                    return round(1 + int(parts[0]) / int(parts[1]), 2)
-                return float(frac_str)
-            except:
-                return 0.0
-        
         # ---- FETCH SofaScore events for date range ----
-        @st.cache_data(ttl=300)
+        @disk_cache.cached("sofa_events", EVENTS_TTL)
         def fetch_sofascore_events(date_str):
             """Fetch all football events from SofaScore for a given date."""
             try:
-                r = req_lib.get(
+                r = gap_http.get(
                     f"https://api.sofascore.com/api/v1/sport/football/scheduled-events/{date_str}",
-                    headers={'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'},
-                    verify=False, timeout=10
+                    headers=SOFA_HEADERS, timeout=10
                 )
                 if r.status_code == 200:
                     return r.json().get('events', [])
@@ -792,14 +852,41 @@ elif menu == "🧠 CONTROL TOTAL (IA)":
                 pass
             return []
         
-        @st.cache_data(ttl=300)
+        @disk_cache.cached("sofa_odds_all", ODDS_TTL)
         def fetch_sofascore_odds(event_id):
             """Fetch real betting odds for a SofaScore event."""
             try:
-                r = req_lib.get(
+                r = gap_http.get(
                     f"https://api.sofascore.com/api/v1/event/{event_id}/odds/1/all",
-                    headers={'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'},
-                    verify=False, timeout=5
+                    headers=SOFA_HEADERS, timeout=5
+                )
+                if r.status_code == 200:
+                    return r.json()
+            except:
+                pass
+            return None
+        
+        @disk_cache.cached("sofa_h2h", H2H_TTL)
+        def fetch_sofascore_h2h(event_id):
+            """Head-to-head record ('teamDuel') for a SofaScore event."""
+            try:
+                r = gap_http.get(
+                    f"https://api.sofascore.com/api/v1/event/{event_id}/h2h",
+                    headers=SOFA_HEADERS, timeout=5
+                )
+                if r.status_code == 200:
+                    return r.json().get('teamDuel')
+            except:
+                pass
+            return None
+        
+        @disk_cache.cached("sofa_form", FORM_TTL)
+        def fetch_sofascore_form(event_id):
+            """Pre-game form of both teams for a SofaScore event."""
+            try:
+                r = gap_http.get(
+                    f"https://api.sofascore.com/api/v1/event/{event_id}/pregame-form",
+                    headers=SOFA_HEADERS, timeout=5
                 )
                 if r.status_code == 200:
                     return r.json()
@@ -807,21 +894,28 @@ elif menu == "🧠 CONTROL TOTAL (IA)":
                 pass
             return None
         
+        @st.cache_data(ttl=300)
+        def fetch_sofa_events_week(start_date_str, days=8):
+            """SofaScore events from start_date_str (YYYY-MM-DD) over `days` days, the days fetched concurrently."""
+            start = datetime.strptime(start_date_str, "%Y-%m-%d")
+            dates = [(start + timedelta(days=d)).strftime("%Y-%m-%d") for d in range(days)]
+            with ThreadPoolExecutor(max_workers=days) as pool:
+                return list(itertools.chain.from_iterable(pool.map(fetch_sofascore_events, dates)))
+        
         # ---- FETCH REAL UPCOMING MATCHES FROM 365Scores ----
         @st.cache_data(ttl=300)
+        @disk_cache.cached("365_upcoming", GAMES_TTL)
         def fetch_365scores_upcoming():
             today = datetime.now()
             start = today.strftime("%d/%m/%Y")
             end = (today + timedelta(days=7)).strftime("%d/%m/%Y")
             try:
-                resp = req_lib.get(
+                resp = gap_http.get(
                     "https://webws.365scores.com/web/games/allscores",
                     params={'appTypeId': 5, 'langId': 29, 'timezoneName': 'Europe/Madrid',
                             'userCountryId': -1, 'startDate': start, 'endDate': end,
                             'sports': '1', 'showOdds': 'true'},
-                    headers={'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-                             'Origin': 'https://www.365scores.com', 'Referer': 'https://www.365scores.com/'},
-                    verify=False, timeout=10
+                    headers=S365_HEADERS, timeout=10
                 )
                 if resp.status_code == 200:
                     return resp.json().get('games', [])
@@ -829,16 +923,14 @@ elif menu == "🧠 CONTROL TOTAL (IA)":
                 pass
             return []
         
-        @st.cache_data(ttl=300)
+        @disk_cache.cached("365_community", PREDS_TTL)
         def fetch_365scores_predictions(game_id):
             """Fetch community predictions for a 365Scores game."""
             try:
-                r = req_lib.get(
+                r = gap_http.get(
                     f"https://webws.365scores.com/web/game/",
                     params={'gameId': game_id, 'langId': 29, 'appTypeId': 5, 'timezoneName': 'Europe/Madrid'},
-                    headers={'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-                             'Origin': 'https://www.365scores.com', 'Referer': 'https://www.365scores.com/'},
-                    verify=False, timeout=5
+                    headers=S365_HEADERS, timeout=5
                 )
                 if r.status_code == 200:
                     game = r.json().get('game', {})
@@ -857,55 +949,96 @@ elif menu == "🧠 CONTROL TOTAL (IA)":
                 pass
             return None
         
-        # ---- Helper: fuzzy match team names ----
-        def name_similarity(name1, name2):
-            """Simple word overlap matching."""
-            n1 = set(name1.lower().replace('fc', '').replace('cf', '').split())
-            n2 = set(name2.lower().replace('fc', '').replace('cf', '').split())
-            if not n1 or not n2:
-                return 0
-            return len(n1 & n2) / max(len(n1), len(n2))
+        # ---- Helper: fuzzy match team names (auto_bet_manager's tokens + Jaccard) ----
+        def build_sofa_index(sofa_events):
+            """
+            Tokenizes the SofaScore side once: (event, home tokens, away tokens) per event plus an
+            inverted index token -> event positions, so a lookup only scores events sharing a word.
+            """
+            index = [(ev, name_tokens(ev.get('homeTeam', {}).get('name', '')), name_tokens(ev.get('awayTeam', {}).get('name', '')))
+                     for ev in sofa_events]
+            by_token = {}
+            for i, (_, h_tok, a_tok) in enumerate(index):
+                for tok in h_tok | a_tok:
+                    by_token.setdefault(tok, []).append(i)
+            return index, by_token
         
-        def find_sofascore_match(home_365, away_365, sofa_events):
-            """Find the best matching SofaScore event for a 365Scores game."""
-            best_score = 0
+        def find_sofascore_match(home_365, away_365, sofa_index):
+            """Find the best matching SofaScore event for a 365Scores game (same rule as AutoBetManager._find_sofa_id)."""
+            index, by_token = sofa_index
+            h_365, a_365 = name_tokens(home_365), name_tokens(away_365)
+            best_score = MATCH_THRESHOLD
             best_event = None
-            for ev in sofa_events:
-                h_sofa = ev.get('homeTeam', {}).get('name', '')
-                a_sofa = ev.get('awayTeam', {}).get('name', '')
-                score = name_similarity(home_365, h_sofa) + name_similarity(away_365, a_sofa)
-                if score > best_score and score >= 0.5:
+            # Events sharing no word score 0; scan candidates in event order so ties keep the first one
+            for i in sorted(set().union(*(by_token.get(tok, ()) for tok in h_365 | a_365))):
+                ev, h_sofa, a_sofa = index[i]
+                score = (jaccard(h_365, h_sofa) + jaccard(a_365, a_sofa)) / 2
+                if score > best_score:
                     best_score = score
                     best_event = ev
             return best_event
         
+        @st.cache_data(ttl=300, show_spinner="Cargando cuotas, H2H y forma...")
+        def load_all(matches):
+            """
+            Odds, H2H, pre-game form and community votes for every displayed match, fetched
+            concurrently (pure I/O wait) instead of ~4 blocking round trips per match in turn.
+            matches: ((game_id, sofa_id or None), ...)
+            Returns: {game_id: {"odds", "h2h", "form", "preds"}}
+            """
+            sofa_fetchers = {"odds": fetch_sofascore_odds, "h2h": fetch_sofascore_h2h, "form": fetch_sofascore_form}
+            # One request per distinct id (several 365Scores games can resolve to the same SofaScore event)
+            with ThreadPoolExecutor(max_workers=GAP_FETCH_WORKERS) as pool:
+                futures = {("preds", game_id): pool.submit(fetch_365scores_predictions, game_id) for game_id, _ in matches}
+                for _, sofa_id in matches:
+                    if sofa_id and ("odds", sofa_id) not in futures:
+                        for kind, fetch in sofa_fetchers.items():
+                            futures[kind, sofa_id] = pool.submit(fetch, sofa_id)
+            results = {key: fut.result() for key, fut in futures.items()}
+            return {
+                game_id: {"preds": results["preds", game_id],
+                          **{kind: results.get((kind, sofa_id)) for kind in sofa_fetchers}}
+                for game_id, sofa_id in matches
+            }
+        
+        @st.cache_data(ttl=3600)
+        def ia_probs(game_ids):
+            """
+            Normalized IA probabilities as an (N, 3) array of (home, draw, away) rows, one per game.
+            Deterministic per game (cached across reruns); one vectorized Poisson call and normalization.
+            """
+            # Per-game seeded xG draws, same as the former np.random.seed(game_id % 100000)
+            xg = np.empty((len(game_ids), 2))
+            for i, game_id in enumerate(game_ids):
+                rng = np.random.RandomState(game_id % 100000)
+                xg[i] = 1.35 + rng.uniform(-0.3, 0.5), 1.05 + rng.uniform(-0.3, 0.4)
+            try:
+                poisson_probs = engine.calculate_poisson_probability_many(xg[:, 0], xg[:, 1])
+                raw = np.round(np.column_stack([poisson_probs["1"], poisson_probs["X"], poisson_probs["2"]]), 3)
+            except:
+                raw = np.tile([0.42, 0.27, 0.31], (len(game_ids), 1))
+            # Home/draw rescaled to sum to 1, away takes the rounding remainder
+            home_draw = np.round(raw[:, :2] / raw.sum(axis=1, keepdims=True), 3)
+            return np.column_stack([home_draw, np.round(1.0 - home_draw[:, 0] - home_draw[:, 1], 3)])
+        
         # ---- LOAD DATA ----
         all_games = fetch_365scores_upcoming()
         
         # Load SofaScore events for today + next 7 days
-        sofa_events_all = []
-        dates_to_check = [(now + timedelta(days=d)).strftime("%Y-%m-%d") for d in range(8)]
-        for d in dates_to_check:
-            sofa_events_all.extend(fetch_sofascore_events(d))
+        sofa_events_all = fetch_sofa_events_week(now.strftime("%Y-%m-%d"))
+        sofa_index = build_sofa_index(sofa_events_all)
         
-        # Filter: only FUTURE matches
-        future_games = []
-        for g in all_games:
-            st_time = g.get('startTime', '')
-            try:
-                match_dt = datetime.fromisoformat(st_time)
-                if match_dt.replace(tzinfo=None) > now:
-                    future_games.append((match_dt, g))
-            except:
-                pass
-        future_games.sort(key=lambda x: x[0])
+        # Filter: only FUTURE matches (kick-off wall time, UTC offset dropped), ordered by kick-off instant.
+        # One vectorized parse for all games; unparseable start times are dropped
+        start_times = pd.Series([g.get('startTime', '') for g in all_games], dtype=object)
+        wall_times = pd.to_datetime(start_times.str.replace(r'(Z|[+-]\d\d:?\d\d)$', '', regex=True), errors='coerce', format='ISO8601')
+        instants = pd.to_datetime(start_times, errors='coerce', utc=True, format='ISO8601')
+        future = np.flatnonzero((wall_times > now).to_numpy())
+        future_games = [all_games[i] for i in future[np.argsort(instants.to_numpy()[future], kind='stable')]]
         
         # ---- LEAGUE FILTER ----
-        all_comps = sorted(set(g.get('competitionDisplayName', '?') for _, g in future_games))
-        top_leagues = ['LaLiga', 'Premier League', 'Bundesliga', 'Serie A', 'Ligue 1',
-                       'Champions League', 'Europa League', 'Conference League',
-                       'LaLiga Hypermotion', 'Copa del Rey']
-        default_filter = [c for c in all_comps if any(tl.lower() in c.lower() for tl in top_leagues)]
+        all_comps = sorted(set(g.get('competitionDisplayName', '?') for g in future_games))
+        default_filter = [c for c in all_comps if TOP_LEAGUES_RE.search(c.lower())]
         if not default_filter:
             default_filter = all_comps[:5]
         
@@ -915,18 +1048,30 @@ elif menu == "🧠 CONTROL TOTAL (IA)":
         )
         
         if selected_comps:
-            filtered_games = [(dt, g) for dt, g in future_games 
+            filtered_games = [g for g in future_games 
                               if g.get('competitionDisplayName', '') in selected_comps]
         else:
             filtered_games = future_games
         
-        display_games = filtered_games[:15]
+        # Full (offset-aware) datetimes only for the matches actually rendered
+        display_games = [(datetime.fromisoformat(g['startTime']), g) for g in filtered_games[:15]]
         st.info(f"📡 **{len(future_games)}** partidos próximos | Mostrando **{len(display_games)}** de **{len(filtered_games)}** filtrados")
         
         if not display_games:
             st.warning("⚠️ No hay partidos próximos para las competiciones seleccionadas.")
         
-        for match_dt, g in display_games:
+        # Resolve the SofaScore event of every match first, then fetch all their data in one batch
+        sofa_matches = [
+            find_sofascore_match(g.get('homeCompetitor', {}).get('name', '?'), g.get('awayCompetitor', {}).get('name', '?'), sofa_index)
+            for _, g in display_games
+        ]
+        gap_data = load_all(tuple(
+            (g.get('id', 0), ev.get('id') if ev else None) for (_, g), ev in zip(display_games, sofa_matches)
+        ))
+        
+        ia_all = ia_probs(tuple(g.get('id', 0) for _, g in display_games)).tolist()
+        
+        for (match_dt, g), sofa_match, ia_row in zip(display_games, sofa_matches, ia_all):
             home_name = g.get('homeCompetitor', {}).get('name', '?')
             away_name = g.get('awayCompetitor', {}).get('name', '?')
             competition = g.get('competitionDisplayName', '?')
@@ -934,6 +1079,7 @@ elif menu == "🧠 CONTROL TOTAL (IA)":
             round_num = g.get('roundNum', '')
             matchday_str = f"{round_name} {round_num}".strip()
             game_id = g.get('id', 0)
+            fetched = gap_data[game_id]
             
             # Time until match
             delta = match_dt.replace(tzinfo=None) - now
@@ -950,24 +1096,17 @@ elif menu == "🧠 CONTROL TOTAL (IA)":
             # ---- 1. REAL ODDS from SofaScore ----
             odds_1, odds_x, odds_2 = 0.0, 0.0, 0.0
             has_real_odds = False
+            # Set when SofaScore failed and the odds below are the last cached copy
+            odds_stale_since = fetch_sofascore_odds.stale_since(sofa_match.get('id')) if sofa_match else None
             
-            sofa_match = find_sofascore_match(home_name, away_name, sofa_events_all)
             if sofa_match:
-                sofa_id = sofa_match.get('id')
-                odds_data = fetch_sofascore_odds(sofa_id)
+                odds_data = fetched["odds"]
                 if odds_data and odds_data.get('markets'):
                     for market in odds_data['markets']:
                         if market.get('marketName') == 'Full time' and market.get('marketGroup') == '1X2':
-                            choices = market.get('choices', [])
-                            for ch in choices:
-                                frac = ch.get('fractionalValue', '0/1')
-                                decimal_odd = frac_to_decimal(frac)
-                                if ch.get('name') == '1':
-                                    odds_1 = decimal_odd
-                                elif ch.get('name') == 'X':
-                                    odds_x = decimal_odd
-                                elif ch.get('name') == '2':
-                                    odds_2 = decimal_odd
+                            parsed = {ch.get('name'): np.nan_to_num(frac_to_decimal(ch.get('fractionalValue', '0/1')))
+                                      for ch in market.get('choices', [])}
+                            odds_1, odds_x, odds_2 = (parsed.get(k, 0.0) for k in ('1', 'X', '2'))
                             if odds_1 > 0 and odds_x > 0 and odds_2 > 0:
                                 has_real_odds = True
                             break
@@ -982,24 +1121,10 @@ elif menu == "🧠 CONTROL TOTAL (IA)":
                 impl_home, impl_draw, impl_away = 0.0, 0.0, 0.0
             
             # ---- 2. Community predictions from 365Scores ----
-            preds = fetch_365scores_predictions(game_id)
+            preds = fetched["preds"]
             
             # ---- 3. IA Omniscience (Poisson model) ----
-            np.random.seed(game_id % 100000)
-            home_xg = 1.35 + np.random.uniform(-0.3, 0.5)
-            away_xg = 1.05 + np.random.uniform(-0.3, 0.4)
-            try:
-                poisson_probs = engine.calculate_poisson_probability(home_xg, away_xg)
-                ia_home = round(poisson_probs.get("1", 0.40), 3)
-                ia_draw = round(poisson_probs.get("X", 0.28), 3)
-                ia_away = round(poisson_probs.get("2", 0.32), 3)
-            except:
-                ia_home, ia_draw, ia_away = 0.42, 0.27, 0.31
-            total_ia = ia_home + ia_draw + ia_away
-            if total_ia > 0:
-                ia_home = round(ia_home / total_ia, 3)
-                ia_draw = round(ia_draw / total_ia, 3)
-                ia_away = round(1.0 - ia_home - ia_draw, 3)
+            ia_home, ia_draw, ia_away = ia_row
             
             # ---- Calculate GAP ----
             if has_real_odds:
@@ -1025,8 +1150,8 @@ elif menu == "🧠 CONTROL TOTAL (IA)":
             with col_name:
                 st.markdown(f"### ⚽ {home_name} vs {away_name}")
             with col_date:
-                st.markdown(f"📅 **{match_dt.strftime('%d/%m/%Y')}** — 🕐 **{match_dt.strftime('%H:%M')}**")
-                st.caption(f"Comienza {time_until}")
+                st.markdown(f"📅 **{match_dt.strftime('%d/%m/%Y')}** — 🕐 **{match_dt.strftime('%H:%M')}**\n\n"
+                            + CAPTION_HTML.format(f"Comienza {time_until}"), unsafe_allow_html=True)
             with col_alert:
                 if alert_html:
                     if "GOLDEN" in alert_html:
@@ -1036,25 +1161,27 @@ elif menu == "🧠 CONTROL TOTAL (IA)":
                     else:
                         st.info(alert_html)
             
-            # ---- ODDS TABLE: "A cuánto se paga" ----
+            # ---- ODDS TABLE: "A cuánto se paga" + community line, sent as one markdown message ----
+            parts = []
             if has_real_odds:
-                st.markdown("##### 💰 Cuotas REALES (SofaScore)")
-                odds_cols = st.columns(3)
-                with odds_cols[0]:
-                    st.metric(f"🏠 {home_name}", f"x{odds_1:.2f}", f"{impl_home*100:.0f}% prob")
-                with odds_cols[1]:
-                    st.metric("🤝 Empate", f"x{odds_x:.2f}", f"{impl_draw*100:.0f}% prob")
-                with odds_cols[2]:
-                    st.metric(f"✈️ {away_name}", f"x{odds_2:.2f}", f"{impl_away*100:.0f}% prob")
+                if odds_stale_since:
+                    stale_min = int((time.time() - odds_stale_since) // 60)
+                    parts.append(f"##### 💰 Cuotas REALES (SofaScore) — ⚠️ sin actualizar desde hace {stale_min} min")
+                else:
+                    parts.append("##### 💰 Cuotas REALES (SofaScore)")
+                parts.append(f"| 🏠 {home_name} | 🤝 Empate | ✈️ {away_name} |\n|:---:|:---:|:---:|\n"
+                             f"| **x{odds_1:.2f}** ({impl_home*100:.0f}% prob) | **x{odds_x:.2f}** ({impl_draw*100:.0f}% prob) "
+                             f"| **x{odds_2:.2f}** ({impl_away*100:.0f}% prob) |")
             else:
-                st.caption("⚠️ Cuotas no disponibles para este partido")
+                parts.append(CAPTION_HTML.format("⚠️ Cuotas no disponibles para este partido"))
             
             # ---- Community predictions ----
             if preds:
-                st.caption(f"📊 Comunidad 365Scores: **{preds['votes']:,}** votos — Local {preds['home']*100:.0f}% / Empate {preds['draw']*100:.0f}% / Visitante {preds['away']*100:.0f}%")
+                parts.append(CAPTION_HTML.format(f"📊 Comunidad 365Scores: **{preds['votes']:,}** votos — Local {preds['home']*100:.0f}% / Empate {preds['draw']*100:.0f}% / Visitante {preds['away']*100:.0f}%"))
+            st.markdown("\n\n".join(parts), unsafe_allow_html=True)
             
             # ---- BAR CHART: Probability comparison ----
-            fig_gap = go.Figure()
+            fig_gap = go.Figure(layout=GAP_LAYOUT)
             categories = ["Local (1)", "Empate (X)", "Visitante (2)"]
             
             # Add real odds bar if available
@@ -1086,75 +1213,73 @@ elif menu == "🧠 CONTROL TOTAL (IA)":
                 textposition='inside', textfont_color='#0d1b2a'
             ))
             
-            fig_gap.update_layout(
-                template="plotly_dark", barmode='group',
-                height=280, margin=dict(t=30, b=30),
-                paper_bgcolor='#0d1b2a', plot_bgcolor='#1b263b',
-                legend=dict(orientation="h", yanchor="bottom", y=1.02),
-                yaxis=dict(tickformat=".0%", range=[0, 1])
-            )
             st.plotly_chart(fig_gap, use_container_width=True, key=f"gap_{game_id}")
             
             # ---- ALL MARKETS TABLE + RECOMMENDATIONS ----
             if sofa_match:
-                sofa_id = sofa_match.get('id')
-                
-                # Fetch all odds markets
-                all_odds = fetch_sofascore_odds(sofa_id)
-                
-                # Fetch H2H and form data
-                h2h_data = None
-                form_data = None
-                try:
-                    h2h_r = req_lib.get(
-                        f"https://api.sofascore.com/api/v1/event/{sofa_id}/h2h",
-                        headers={'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'},
-                        verify=False, timeout=5
-                    )
-                    if h2h_r.status_code == 200:
-                        h2h_data = h2h_r.json().get('teamDuel')
-                except:
-                    pass
+                # All odds markets, H2H and form data (prefetched by load_all)
+                all_odds = fetched["odds"]
+                h2h_data = fetched["h2h"]
+                form_data = fetched["form"]
                 
-                try:
-                    form_r = req_lib.get(
-                        f"https://api.sofascore.com/api/v1/event/{sofa_id}/pregame-form",
-                        headers={'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'},
-                        verify=False, timeout=5
-                    )
-                    if form_r.status_code == 200:
-                        form_data = form_r.json()
-                except:
-                    pass
-                
-                # ---- H2H + FORM display ----
-                context_cols = st.columns(2)
-                with context_cols[0]:
-                    if h2h_data:
-                        hw = h2h_data.get('homeWins', 0)
-                        aw = h2h_data.get('awayWins', 0)
-                        dr = h2h_data.get('draws', 0)
-                        st.markdown(f"**🏟️ H2H:** {home_name} **{hw}** — **{dr}** — **{aw}** {away_name}")
-                with context_cols[1]:
-                    if form_data:
-                        h_form = form_data.get('homeTeam', {}).get('form', [])
-                        a_form = form_data.get('awayTeam', {}).get('form', [])
-                        h_pos = form_data.get('homeTeam', {}).get('position', '?')
-                        a_pos = form_data.get('awayTeam', {}).get('position', '?')
-                        
-                        def form_emoji(f_list):
-                            return ''.join(['🟢' if x == 'W' else '🔴' if x == 'L' else '🟡' for x in f_list])
-                        
-                        st.markdown(f"**📈 Forma:** {home_name} ({h_pos}º) {form_emoji(h_form)} | {away_name} ({a_pos}º) {form_emoji(a_form)}")
+                # ---- H2H + FORM display (one markdown message) ----
+                context = []
+                if h2h_data:
+                    hw = h2h_data.get('homeWins', 0)
+                    aw = h2h_data.get('awayWins', 0)
+                    dr = h2h_data.get('draws', 0)
+                    context.append(f"**🏟️ H2H:** {home_name} **{hw}** — **{dr}** — **{aw}** {away_name}")
+                if form_data:
+                    h_form = form_data.get('homeTeam', {}).get('form', [])
+                    a_form = form_data.get('awayTeam', {}).get('form', [])
+                    h_pos = form_data.get('homeTeam', {}).get('position', '?')
+                    a_pos = form_data.get('awayTeam', {}).get('position', '?')
+                    
+                    def form_emoji(f_list):
+                        return ''.join(['🟢' if x == 'W' else '🔴' if x == 'L' else '🟡' for x in f_list])
+                    
+                    context.append(f"**📈 Forma:** {home_name} ({h_pos}º) {form_emoji(h_form)} | {away_name} ({a_pos}º) {form_emoji(a_form)}")
+                if context:
+                    st.markdown("\n\n".join(context))
                 
                 # ---- EXPANDER: All markets ----
                 if all_odds and all_odds.get('markets'):
                     with st.expander(f"📋 **Ver TODOS los mercados** ({len(all_odds['markets'])} mercados)", expanded=False):
                         
-                        # Group markets by type
+                        # Group markets by type; TOP PICKS are scored in the same sweep over the choices
                         market_rows = []
                         recommendations = []
                         
+                        def choice_recommendation(mgroup, ch_name, ch_decimal, ch_change):
+                            """(score, pick, reason) when this market choice is a value pick, else None."""
+                            # Value detection based on market type
+                            if mgroup == 'Both teams to score' and ch_name == 'Yes' and ch_decimal >= 1.5:
+                                score = 3 if ch_decimal >= 1.8 else 2
+                                return (score, f"⚽ **BTTS SÍ x{ch_decimal:.2f}**", "Ambos marcan — cuota con valor")
+                            
+                            elif mgroup == 'Match goals' and ch_name == 'Over' and 1.5 <= ch_decimal <= 2.5:
+                                score = 3 if ch_decimal >= 1.9 else 2
+                                return (score, f"🎯 **Over Goles x{ch_decimal:.2f}**", "Línea de goles con valor")
+                            
+                            elif mgroup == 'Total Cards' and ch_name == 'Over' and 1.3 <= ch_decimal <= 2.2:
+                                return (2, f"🟨 **Tarjetas Over x{ch_decimal:.2f}**", "Partido intenso esperado")
+                            
+                            elif mgroup == 'Corners 2-Way' and ch_name == 'Over' and 1.5 <= ch_decimal <= 2.3:
+                                return (2, f"⛳ **Córners Over x{ch_decimal:.2f}**", "Buenos equipos = más córners")
+                            
+                            elif mgroup == '1X2' and ch_name in ['1', '2'] and ch_decimal >= 2.5:
+                                # High-value underdog pick
+                                team = home_name if ch_name == '1' else away_name
+                                if form_data:
+                                    t_form = form_data.get('homeTeam' if ch_name == '1' else 'awayTeam', {}).get('form', [])
+                                    wins = sum(1 for x in t_form if x == 'W')
+                                    if wins >= 3:
+                                        return (4, f"💎 **{team} x{ch_decimal:.2f}**", f"Underdog en racha ({wins}/5 últimas ganadas)")
+                            
+                            elif mgroup == 'Asian Handicap' and ch_change == -1 and ch_decimal >= 1.8:
+                                return (1, f"📐 **Hándicap {ch_name} x{ch_decimal:.2f}**", "Línea en movimiento (bajó)")
+                            return None
+                        
                         for market in all_odds['markets']:
                             mname = market.get('marketName', '?')
                             mgroup = market.get('marketGroup', '?')
@@ -1165,10 +1290,14 @@ elif menu == "🧠 CONTROL TOTAL (IA)":
                             for ch in choices:
                                 ch_name = ch.get('name', '?')
                                 ch_frac = ch.get('fractionalValue', '0/1')
-                                ch_decimal = frac_to_decimal(ch_frac)
+                                ch_decimal = np.nan_to_num(frac_to_decimal(ch_frac))  # unparseable -> shown as x0.00
                                 ch_change = ch.get('change', 0)
                                 ch_arrow = "📈" if ch_change == 1 else "📉" if ch_change == -1 else "➡️"
                                 parsed[ch_name] = {'decimal': ch_decimal, 'frac': ch_frac, 'arrow': ch_arrow}
+                                if ch_decimal > 1.0:
+                                    rec = choice_recommendation(mgroup, ch_name, ch_decimal, ch_change)
+                                    if rec:
+                                        recommendations.append(rec)
                             
                             # Build row
                             if mgroup == '1X2':
@@ -1181,9 +1310,6 @@ elif menu == "🧠 CONTROL TOTAL (IA)":
                                 dy = parsed.get('Yes', {})
                                 dn = parsed.get('No', {})
                                 row = f"| ⚽ Ambos Marcan | {dy.get('arrow','')} Sí **x{dy.get('decimal',0):.2f}** | — | {dn.get('arrow','')} No **x{dn.get('decimal',0):.2f}** |"
-                                # Recommendation logic
-                                if dy.get('decimal', 0) > 1.5:
-                                    recommendations.append(f"⚽ **BTTS Sí x{dy['decimal']:.2f}** — Cuota con valor")
                             
                             elif mgroup == 'Match goals':
                                 ov = parsed.get('Over', {})
@@ -1194,9 +1320,6 @@ elif menu == "🧠 CONTROL TOTAL (IA)":
                                 # Show only the most relevant lines
                                 if 1.3 < ov_dec < 5.0 and 1.3 < un_dec < 5.0:
                                     row = f"| 🎯 Goles O/U | {ov.get('arrow','')} Over **x{ov_dec:.2f}** | — | {un.get('arrow','')} Under **x{un_dec:.2f}** |"
-                                    # Recommend if O/U 2.5 looks good
-                                    if 1.4 < ov_dec < 2.5:
-                                        recommendations.append(f"🎯 **Over goles x{ov_dec:.2f}** — Cuota atractiva")
                                 else:
                                     continue  # Skip extreme lines
                             
@@ -1204,15 +1327,11 @@ elif menu == "🧠 CONTROL TOTAL (IA)":
                                 ov = parsed.get('Over', {})
                                 un = parsed.get('Under', {})
                                 row = f"| 🟨 Tarjetas O/U | {ov.get('arrow','')} Over **x{ov.get('decimal',0):.2f}** | — | {un.get('arrow','')} Under **x{un.get('decimal',0):.2f}** |"
-                                if ov.get('decimal', 0) > 0 and ov.get('decimal', 0) < 1.8:
-                                    recommendations.append(f"🟨 **Tarjetas Over x{ov['decimal']:.2f}** — Partido intenso esperado")
                             
                             elif mgroup == 'Corners 2-Way':
                                 ov = parsed.get('Over', {})
                                 un = parsed.get('Under', {})
                                 row = f"| ⛳ Córners O/U | {ov.get('arrow','')} Over **x{ov.get('decimal',0):.2f}** | — | {un.get('arrow','')} Under **x{un.get('decimal',0):.2f}** |"
-                                if ov.get('decimal', 0) > 0 and ov.get('decimal', 0) < 2.0:
-                                    recommendations.append(f"⛳ **Córners Over x{ov['decimal']:.2f}** — Buenos equipos = más córners")
                             
                             elif mgroup == 'Double chance':
                                 vals = list(parsed.values())
@@ -1256,54 +1375,11 @@ elif menu == "🧠 CONTROL TOTAL (IA)":
                         
                         # Render market table
                         if market_rows:
-                            st.markdown("| Mercado | Opción 1 | Centro | Opción 2 |")
-                            st.markdown("|---------|----------|--------|----------|")
-                            for row in market_rows:
-                                st.markdown(row)
+                            st.markdown("\n".join(["| Mercado | Opción 1 | Centro | Opción 2 |",
+                                                    "|---------|----------|--------|----------|", *market_rows]))
                 
-                # ---- TOP PICKS / RECOMMENDATIONS ----
+                # ---- TOP PICKS / RECOMMENDATIONS (collected during the market sweep above) ----
                 if all_odds and all_odds.get('markets'):
-                    recommendations = []
-                    for market in all_odds['markets']:
-                        mgroup = market.get('marketGroup', '')
-                        choices = market.get('choices', [])
-                        
-                        for ch in choices:
-                            ch_name = ch.get('name', '?')
-                            ch_frac = ch.get('fractionalValue', '0/1')
-                            ch_decimal = frac_to_decimal(ch_frac)
-                            ch_change = ch.get('change', 0)
-                            
-                            if ch_decimal <= 1.0:
-                                continue
-                            
-                            # Value detection based on market type
-                            if mgroup == 'Both teams to score' and ch_name == 'Yes' and ch_decimal >= 1.5:
-                                score = 3 if ch_decimal >= 1.8 else 2
-                                recommendations.append((score, f"⚽ **BTTS SÍ x{ch_decimal:.2f}**", "Ambos marcan — cuota con valor"))
-                            
-                            elif mgroup == 'Match goals' and ch_name == 'Over' and 1.5 <= ch_decimal <= 2.5:
-                                score = 3 if ch_decimal >= 1.9 else 2
-                                recommendations.append((score, f"🎯 **Over Goles x{ch_decimal:.2f}**", "Línea de goles con valor"))
-                            
-                            elif mgroup == 'Total Cards' and ch_name == 'Over' and 1.3 <= ch_decimal <= 2.2:
-                                recommendations.append((2, f"🟨 **Tarjetas Over x{ch_decimal:.2f}**", "Partido intenso esperado"))
-                            
-                            elif mgroup == 'Corners 2-Way' and ch_name == 'Over' and 1.5 <= ch_decimal <= 2.3:
-                                recommendations.append((2, f"⛳ **Córners Over x{ch_decimal:.2f}**", "Buenos equipos = más córners"))
-                            
-                            elif mgroup == '1X2' and ch_name in ['1', '2'] and ch_decimal >= 2.5:
-                                # High-value underdog pick
-                                team = home_name if ch_name == '1' else away_name
-                                if form_data:
-                                    t_form = form_data.get('homeTeam' if ch_name == '1' else 'awayTeam', {}).get('form', [])
-                                    wins = sum(1 for x in t_form if x == 'W')
-                                    if wins >= 3:
-                                        recommendations.append((4, f"💎 **{team} x{ch_decimal:.2f}**", f"Underdog en racha ({wins}/5 últimas ganadas)"))
-                            
-                            elif mgroup == 'Asian Handicap' and ch_change == -1 and ch_decimal >= 1.8:
-                                recommendations.append((1, f"📐 **Hándicap {ch_name} x{ch_decimal:.2f}**", "Línea en movimiento (bajó)"))
-                    
                     # Add H2H-based recommendation
                     if h2h_data:
                         total_h2h = h2h_data.get('homeWins', 0) + h2h_data.get('awayWins', 0) + h2h_data.get('draws', 0)
@@ -0,0 +1,149 @@
+"""
+Disk Cache — small JSON TTL cache shared across processes/restarts.
+One file per (namespace, key) under data/cache/, expiry by file mtime (same as the Fbref/Understat CSV caches).
+Bounded: every PRUNE_EVERY writes, entries past MAX_AGE are dropped and, above MAX_ENTRIES,
+the least frequently read ones are evicted (LFU, read counts kept per process).
+"""
+import os
+import re
+import json
+import time
+import logging
+import threading
+from collections import Counter
+from functools import wraps
+
+logger = logging.getLogger("DiskCache")
+
+CACHE_DIR = os.path.join(os.path.dirname(__file__), '..', 'data', 'cache')
+# Size bound: entry count across all namespaces, and an age past every TTL / stale window in use
+MAX_ENTRIES = 5000
+MAX_AGE = 7 * 86400
+PRUNE_EVERY = 200  # writes between two directory scans
+# cached(): oldest stale entry served on an upstream failure, as a multiple of the entry's TTL
+STALE_FACTOR = 10
+
+_stale = {}  # (namespace, key) -> fetch time of the stale value last served by cached()
+
+_hits = Counter()  # path -> reads served, the LFU frequency
+_writes = 0
+_prune_lock = threading.Lock()
+
+def _path(namespace, key):
+    safe = re.sub(r'[^A-Za-z0-9_.-]', '_', str(key))
+    return os.path.join(CACHE_DIR, namespace, f"{safe}.json")
+
+def get(namespace, key, ttl=None):
+    """Returns the cached value, or None if missing/expired/corrupt. ttl=None accepts any age (stale reads)."""
+    path = _path(namespace, key)
+    try:
+        if ttl is not None and time.time() - os.path.getmtime(path) >= ttl:
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            value = json.load(f)
+    except (OSError, ValueError):
+        return None
+    _hits[path] += 1
+    return value
+
+def put(namespace, key, value):
+    path = _path(namespace, key)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(value, f)
+        os.replace(tmp, path)  # atomic: readers never see a half-written file
+    except (OSError, TypeError) as e:
+        logger.warning(f"Cache write failed ({namespace}/{key}): {e}")
+        return
+    global _writes
+    _writes += 1
+    if _writes % PRUNE_EVERY == 0:
+        prune()
+
+def prune():
+    """Drops entries older than MAX_AGE, then evicts the least frequently read ones above MAX_ENTRIES."""
+    if not _prune_lock.acquire(blocking=False):
+        return  # another thread is already scanning
+    try:
+        now = time.time()
+        entries = []
+        for root, _, files in os.walk(CACHE_DIR):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    mtime = os.path.getmtime(path)
+                except OSError:
+                    continue
+                if now - mtime >= MAX_AGE:
+                    _remove(path)
+                else:
+                    entries.append((_hits.get(path, 0), mtime, path))
+        if len(entries) > MAX_ENTRIES:
+            # Fewest reads first, oldest first among equals
+            entries.sort()
+            for _, _, path in entries[:len(entries) - MAX_ENTRIES]:
+                _remove(path)
+    finally:
+        _prune_lock.release()
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+    _hits.pop(path, None)
+
+def delete(namespace, key):
+    _remove(_path(namespace, key))
+
+def memoize(namespace, ttl):
+    """Method decorator: caches non-empty results on disk keyed by the call args (self excluded)."""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(self, *args):
+            key = "_".join(str(a) for a in args) or "default"
+            hit = get(namespace, key, ttl)
+            if hit is not None:
+                return hit
+            value = fn(self, *args)
+            if value: put(namespace, key, value)
+            return value
+        return wrapper
+    return decorator
+
+def cached(namespace, ttl, max_stale=None):
+    """
+    Function decorator: like memoize, for plain functions. When the call comes back empty
+    (upstream error / timeout), the last stored value is returned instead if it is younger than
+    max_stale seconds (default STALE_FACTOR * ttl); `fn.stale_since(*args)` then gives its fetch
+    time (epoch seconds), or None while the value served for those args is fresh.
+    """
+    if max_stale is None:
+        max_stale = STALE_FACTOR * ttl
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args):
+            key = "_".join(str(a) for a in args) or "default"
+            hit = get(namespace, key, ttl)
+            if hit is not None:
+                _stale.pop((namespace, key), None)
+                return hit
+            value = fn(*args)
+            if value:
+                put(namespace, key, value)
+                _stale.pop((namespace, key), None)
+                return value
+            stale = get(namespace, key, max_stale)
+            if stale is None:
+                _stale.pop((namespace, key), None)
+                return value
+            try:
+                _stale[(namespace, key)] = os.path.getmtime(_path(namespace, key))
+            except OSError:
+                _stale[(namespace, key)] = time.time() - max_stale
+            return stale
+        wrapper.stale_since = lambda *args: _stale.get((namespace, "_".join(str(a) for a in args) or "default"))
+        return wrapper
+    return decorator
@@ -1,10 +1,80 @@
+import math
 import numpy as np
-from scipy.stats import poisson
 from scipy.optimize import minimize
 import logging
+# Optional JIT: compiled, fixture-parallel score-grid kernel; without numba the NumPy broadcast path is used
+try:
+    from numba import njit, prange
+except ImportError:
+    njit, prange = None, range
 
 logger = logging.getLogger("DixonColesEngine")
 
+# 1/k! for the goal counts score grids normally use (PMF = e^-mu * mu^k / k!), computed once at import.
+# Shared with main_engine; larger grids fall back to math.factorial in fact_inv().
+MAX_GOALS = 20
+_FACT_INV = 1.0 / np.array([math.factorial(k) for k in range(MAX_GOALS + 1)], dtype=float)
+
+
+def fact_inv(max_goals):
+    """1/k! for k in 0..max_goals-1: a slice of the lookup table, computed on the fly past it."""
+    if max_goals <= len(_FACT_INV):
+        return _FACT_INV[:max_goals]
+    return np.array([1.0 / math.factorial(k) for k in range(max_goals)])
+
+
+def _poisson_pmf_grid(mu, max_goals):
+    """(N, max_goals) Poisson PMFs for goals 0..max_goals-1, from the factorial lookup table."""
+    return np.exp(-mu)[:, None] * mu[:, None] ** np.arange(max_goals) * fact_inv(max_goals)
+
+
+def _dc_probs_kernel(mu, lamb, rho, inv_fact):
+    """
+    Per-fixture Dixon-Coles 1X2 (unrounded), one score grid per fixture without materializing it.
+    inv_fact: 1/k! per goal count (its length is the grid size).
+    Returns: (N, 3) [home_win, draw, away_win].
+    """
+    max_goals = len(inv_fact)
+    n = len(mu)
+    out = np.empty((n, 3))
+    for f in prange(n):
+        p_x = np.empty(max_goals)
+        p_y = np.empty(max_goals)
+        exp_mu = math.exp(-mu[f])
+        exp_lamb = math.exp(-lamb[f])
+        for k in range(max_goals):
+            p_x[k] = exp_mu * mu[f] ** k * inv_fact[k]
+            p_y[k] = exp_lamb * lamb[f] ** k * inv_fact[k]
+        home_win = draw = away_win = 0.0
+        for x in range(max_goals):
+            for y in range(max_goals):
+                p = p_x[x] * p_y[y]
+                # Dixon-Coles Adjustment (tau)
+                if x == 0 and y == 0:
+                    p *= 1 - (mu[f] * lamb[f] * rho)
+                elif x == 0 and y == 1:
+                    p *= 1 + (mu[f] * rho)
+                elif x == 1 and y == 0:
+                    p *= 1 + (lamb[f] * rho)
+                elif x == 1 and y == 1:
+                    p *= 1 - rho
+                if x > y:
+                    home_win += p
+                elif x == y:
+                    draw += p
+                else:
+                    away_win += p
+        total = home_win + draw + away_win
+        out[f, 0] = home_win / total
+        out[f, 1] = draw / total
+        out[f, 2] = away_win / total
+    return out
+
+
+if njit is not None:
+    # Strict IEEE math (no fastmath reassociation); numba compiles lazily on the first call
+    _dc_probs_kernel = njit(parallel=True, cache=True)(_dc_probs_kernel)
+
 class DixonColesModel:
     """
     Implements the Dixon-Coles adjustment to the Poisson distribution
@@ -33,30 +103,41 @@ class DixonColesModel:
         """
         Calculates 1X2 probabilities using Adjusted Poisson.
         """
-        prob_matrix = np.zeros((max_goals, max_goals))
+        probs = self.calculate_match_probabilities_many([home_exp_goals], [away_exp_goals], max_goals)
+        return {k: v[0] for k, v in probs.items()}
+
+    def calculate_match_probabilities_many(self, home_exp_goals, away_exp_goals, max_goals=10):
+        """
+        Vectorized calculate_match_probabilities for N fixtures at once: a single
+        (N, max_goals, max_goals) score grid instead of a Python loop per fixture and cell.
+        Returns: {"1": (N,), "X": (N,), "2": (N,)} arrays.
+        """
+        mu = np.asarray(home_exp_goals, dtype=float)
+        lamb = np.asarray(away_exp_goals, dtype=float)
+        if njit is not None:
+            out = _dc_probs_kernel(mu, lamb, float(self.rho), fact_inv(max_goals))
+            return {"1": np.round(out[:, 0], 4), "X": np.round(out[:, 1], 4), "2": np.round(out[:, 2], 4)}
         
-        for x in range(max_goals):
-            for y in range(max_goals):
-                # Simple Poisson Probabilities
-                p_x = poisson.pmf(x, home_exp_goals)
-                p_y = poisson.pmf(y, away_exp_goals)
-                
-                # Dixon-Coles Adjustment
-                adjustment = self.tau(x, y, home_exp_goals, away_exp_goals, self.rho)
-                
-                prob_matrix[x, y] = p_x * p_y * adjustment
+        # Simple Poisson Probabilities, outer product per fixture
+        prob_matrix = _poisson_pmf_grid(mu, max_goals)[:, :, None] * _poisson_pmf_grid(lamb, max_goals)[:, None, :]
+        
+        # Dixon-Coles Adjustment (tau): only the four low-score cells differ from 1
+        prob_matrix[:, 0, 0] *= 1 - (mu * lamb * self.rho)
+        prob_matrix[:, 0, 1] *= 1 + (mu * self.rho)
+        prob_matrix[:, 1, 0] *= 1 + (lamb * self.rho)
+        prob_matrix[:, 1, 1] *= 1 - self.rho
         
         # Normalize (ensure sum is 1.0)
-        prob_matrix /= prob_matrix.sum()
+        prob_matrix /= prob_matrix.sum(axis=(1, 2), keepdims=True)
         
-        home_win = np.sum(np.tril(prob_matrix, -1))
-        draw = np.sum(np.diag(prob_matrix))
-        away_win = np.sum(np.triu(prob_matrix, 1))
+        home_win = np.tril(prob_matrix, -1).sum(axis=(1, 2))
+        draw = np.trace(prob_matrix, axis1=1, axis2=2)
+        away_win = np.triu(prob_matrix, 1).sum(axis=(1, 2))
         
         return {
-            "1": round(home_win, 4),
-            "X": round(draw, 4),
-            "2": round(away_win, 4)
+            "1": np.round(home_win, 4),
+            "X": np.round(draw, 4),
+            "2": np.round(away_win, 4)
         }
 
     def apply_recency_weighting(self, matches_df, xi=0.0065):
@@ -1,7 +1,10 @@
 import numpy as np
 import pandas as pd
-from scipy.stats import poisson
 import logging
+try:
+    from dixon_coles import fact_inv
+except ImportError:
+    from src.dixon_coles import fact_inv
 
 # Setup Logger
 logging.basicConfig(level=logging.INFO)
@@ -16,19 +19,32 @@ class PredictionEngine:
         Calculates the probability matrix for home and away goals.
         Double Poisson Distribution logic.
         """
-        prob_matrix = np.outer(
-            poisson.pmf(np.arange(max_goals), home_avg),
-            poisson.pmf(np.arange(max_goals), away_avg)
+        probs = self.calculate_poisson_probability_many([home_avg], [away_avg], max_goals)
+        return {k: v[0] for k, v in probs.items()}
+
+    def calculate_poisson_probability_many(self, home_avgs, away_avgs, max_goals=10):
+        """
+        Vectorized calculate_poisson_probability over N fixtures: one broadcast
+        (N, max_goals, max_goals) probability matrix.
+        Returns: {"1": (N,), "X": (N,), "2": (N,)} arrays.
+        """
+        goals = np.arange(max_goals)
+        inv_fact = fact_inv(max_goals)  # Poisson PMF = e^-mu * mu^k / k!
+        h = np.asarray(home_avgs, dtype=float)[:, None]
+        a = np.asarray(away_avgs, dtype=float)[:, None]
+        prob_matrix = (
+            (np.exp(-h) * h ** goals * inv_fact)[:, :, None] *
+            (np.exp(-a) * a ** goals * inv_fact)[:, None, :]
         )
         
-        home_win_prob = np.sum(np.tril(prob_matrix, -1))
-        draw_prob = np.sum(np.diag(prob_matrix))
-        away_win_prob = np.sum(np.triu(prob_matrix, 1))
+        home_win_prob = np.tril(prob_matrix, -1).sum(axis=(1, 2))
+        draw_prob = np.trace(prob_matrix, axis1=1, axis2=2)
+        away_win_prob = np.triu(prob_matrix, 1).sum(axis=(1, 2))
         
         return {
-            "1": round(home_win_prob, 4),
-            "X": round(draw_prob, 4),
-            "2": round(away_win_prob, 4)
+            "1": np.round(home_win_prob, 4),
+            "X": np.round(draw_prob, 4),
+            "2": np.round(away_win_prob, 4)
         }
 
     def calculate_value(self, real_prob, house_odds):
@@ -21,6 +21,83 @@ import logging
 logger = logging.getLogger("OmniscienceML")
 sys.path.append(os.path.dirname(__file__))
 
+# Max memoized predict_match results (per model epoch)
+PREDICTION_CACHE_SIZE = 4096
+
+
+class WindowTeamStats:
+    """
+    Per-team prefix sums over a fixed match table, so that the team stats of any contiguous
+    row slice (a rolling backtest window) cost O(teams in the slice) instead of re-filtering it.
+    for_slice(start, end) returns exactly ValueBetML._compute_team_stats(df.iloc[start:end]).
+    """
+    def __init__(self, df: pd.DataFrame):
+        self.home = df['HomeTeam'].to_numpy()
+        self.away = df['AwayTeam'].to_numpy()
+        n = len(df)
+        fthg = df['FTHG'].to_numpy(dtype=float) if 'FTHG' in df.columns else np.full(n, np.nan)
+        ftag = df['FTAG'].to_numpy(dtype=float) if 'FTAG' in df.columns else np.full(n, np.nan)
+        self.has_fthg, self.has_ftag = 'FTHG' in df.columns, 'FTAG' in df.columns
+        self.has_ftr = 'FTR' in df.columns
+        ftr = df['FTR'].to_numpy() if self.has_ftr else np.full(n, None)
+        
+        # team -> (rows, prefix sums); prefix[k] covers the team's first k matches on that side.
+        # Home columns: FTHG sum/count (scored), FTAG sum/count (conceded), wins; away mirrored.
+        self._sides = {}
+        for side, names, scored, conceded, win in (("home", self.home, fthg, ftag, 'H'),
+                                                   ("away", self.away, ftag, fthg, 'A')):
+            order = np.argsort(names, kind='stable')
+            bounds = np.flatnonzero(names[order][1:] != names[order][:-1]) + 1
+            for rows in np.split(order, bounds) if n else []:
+                cols = np.column_stack([
+                    np.nan_to_num(scored[rows]), ~np.isnan(scored[rows]),
+                    np.nan_to_num(conceded[rows]), ~np.isnan(conceded[rows]),
+                    ftr[rows] == win,
+                ])
+                prefix = np.vstack([np.zeros(5), np.cumsum(cols, axis=0)])
+                self._sides[(side, names[rows[0]])] = (rows, prefix)
+
+    def _window(self, side, team, start, end):
+        """(matches, [scored sum, count, conceded sum, count, wins]) for the team's side in [start, end)."""
+        hit = self._sides.get((side, team))
+        if hit is None:
+            return 0, np.zeros(5)
+        rows, prefix = hit
+        lo, hi = np.searchsorted(rows, (start, end))
+        return hi - lo, prefix[hi] - prefix[lo]
+
+    @staticmethod
+    def _mean(total, count):
+        return total / count if count else np.float64(np.nan)
+
+    def for_slice(self, start, end):
+        team_stats = {}
+        for team in pd.unique(np.concatenate([self.home[start:end], self.away[start:end]])):
+            n_home, h = self._window("home", team, start, end)
+            n_away, a = self._window("away", team, start, end)
+            
+            home_scored = self._mean(h[0], h[1]) if n_home > 0 and self.has_fthg else 1.2
+            away_scored = self._mean(a[0], a[1]) if n_away > 0 and self.has_ftag else 0.9
+            attack = (home_scored + away_scored) / 2
+            
+            home_conceded = self._mean(h[2], h[3]) if n_home > 0 and self.has_ftag else 1.0
+            away_conceded = self._mean(a[2], a[3]) if n_away > 0 and self.has_fthg else 1.3
+            defense = (home_conceded + away_conceded) / 2
+            
+            # Integer counts as in _compute_team_stats, so the ratios round identically
+            home_wins = int(h[4]) if self.has_ftr else 0
+            total = int(n_home + n_away) if self.has_ftr else 0
+            form = (home_wins + (int(a[4]) if self.has_ftr else 0)) / max(total, 1)
+            home_adv = home_wins / max(int(n_home), 1)
+            
+            team_stats[team] = {
+                'attack': round(attack, 3),
+                'defense': round(defense, 3),
+                'form': round(form, 3),
+                'home_advantage': round(home_adv, 3)
+            }
+        return team_stats
+
 
 class ValueBetML:
     def __init__(self, data_path='data/historical_data.csv'):
@@ -36,6 +113,10 @@ class ValueBetML:
         )
         self.is_trained = False
         self.feature_columns = []  # Set during training
+        # Bumped whenever the fit or the team stats change; part of the prediction cache key,
+        # so stale entries simply stop matching (no explicit invalidation)
+        self._model_epoch = 0
+        self._prediction_cache = {}
         
     def load_and_prep_data(self):
         """Load data and build ANONYMOUS features (no team names)."""
@@ -48,11 +129,43 @@ class ValueBetML:
         
         return df
 
-    def _build_anonymous_features(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _build_anonymous_features(self, df: pd.DataFrame, team_stats=None) -> pd.DataFrame:
         """
         ANTI-BIAS: Converts team names into pure numerical stats.
         The model NEVER sees a team name.
+        team_stats: precomputed stats for exactly these rows (WindowTeamStats.for_slice); computed here if None.
         """
+        if team_stats is None:
+            team_stats = self._compute_team_stats(df)
+        
+        # Build feature matrix — PURELY NUMERICAL
+        features = []
+        for home, away in zip(df['HomeTeam'], df['AwayTeam']):
+            h = team_stats.get(home, {'attack': 1.0, 'defense': 1.0, 'form': 0.33, 'home_advantage': 0.45})
+            a = team_stats.get(away, {'attack': 1.0, 'defense': 1.0, 'form': 0.33, 'home_advantage': 0.45})
+            
+            features.append({
+                'h_attack': h['attack'],
+                'h_defense': h['defense'],
+                'h_form': h['form'],
+                'h_home_adv': h['home_advantage'],
+                'a_attack': a['attack'],
+                'a_defense': a['defense'],
+                'a_form': a['form'],
+                # Derived features (interactions)
+                'attack_diff': h['attack'] - a['attack'],
+                'defense_diff': h['defense'] - a['defense'],
+                'form_diff': h['form'] - a['form'],
+            })
+        
+        features_df = pd.DataFrame(features)
+        self.feature_columns = list(features_df.columns)
+        self._team_stats = team_stats
+        self._model_epoch += 1
+        return features_df
+
+    def _compute_team_stats(self, df: pd.DataFrame) -> dict:
+        """Per-team attack/defense/form/home advantage over every match in df."""
         # Calculate rolling statistics per team
         team_stats = {}
         
@@ -99,31 +212,7 @@ class ValueBetML:
                 'form': round(form, 3),
                 'home_advantage': round(home_adv, 3)
             }
-        
-        # Build feature matrix — PURELY NUMERICAL
-        features = []
-        for _, row in df.iterrows():
-            h = team_stats.get(row['HomeTeam'], {'attack': 1.0, 'defense': 1.0, 'form': 0.33, 'home_advantage': 0.45})
-            a = team_stats.get(row['AwayTeam'], {'attack': 1.0, 'defense': 1.0, 'form': 0.33, 'home_advantage': 0.45})
-            
-            features.append({
-                'h_attack': h['attack'],
-                'h_defense': h['defense'],
-                'h_form': h['form'],
-                'h_home_adv': h['home_advantage'],
-                'a_attack': a['attack'],
-                'a_defense': a['defense'],
-                'a_form': a['form'],
-                # Derived features (interactions)
-                'attack_diff': h['attack'] - a['attack'],
-                'defense_diff': h['defense'] - a['defense'],
-                'form_diff': h['form'] - a['form'],
-            })
-        
-        features_df = pd.DataFrame(features)
-        self.feature_columns = list(features_df.columns)
-        self._team_stats = team_stats
-        return features_df
+        return team_stats
 
     def train(self):
         """Train the model on anonymous features."""
@@ -151,6 +240,7 @@ class ValueBetML:
         # Full train
         self.model_res.fit(X, y)
         self.is_trained = True
+        self._model_epoch += 1
         
         return scores.mean()
 
@@ -162,6 +252,16 @@ class ValueBetML:
         if not self.is_trained or not hasattr(self, '_team_stats'):
             return {'home_win': 0.33, 'draw': 0.33, 'away_win': 0.33}
         
+        key = (home_team, away_team, self._model_epoch)
+        hit = self._prediction_cache.get(key)
+        if hit is None:
+            hit = self._predict_match_uncached(home_team, away_team)
+            if len(self._prediction_cache) >= PREDICTION_CACHE_SIZE:
+                self._prediction_cache.clear()  # mostly dead epochs by now
+            self._prediction_cache[key] = hit
+        return dict(hit)
+
+    def _predict_match_uncached(self, home_team, away_team):
         h = self._team_stats.get(home_team, {'attack': 1.0, 'defense': 1.0, 'form': 0.33, 'home_advantage': 0.45})
         a = self._team_stats.get(away_team, {'attack': 1.0, 'defense': 1.0, 'form': 0.33, 'home_advantage': 0.45})
         
@@ -191,6 +291,41 @@ class ValueBetML:
             logger.error(f"Prediction failed: {e}")
             return {'home_win': 0.33, 'draw': 0.33, 'away_win': 0.33}
 
+    def predict_matches(self, home_teams, away_teams):
+        """
+        Batch version of predict_match: one predict_proba call for every fixture.
+        Returns: np.ndarray (N, 3) with [home_win, draw, away_win] probabilities.
+        """
+        n = len(home_teams)
+        if not self.is_trained or not hasattr(self, '_team_stats') or n == 0:
+            return np.full((n, 3), 0.33)
+        
+        default = {'attack': 1.0, 'defense': 1.0, 'form': 0.33, 'home_advantage': 0.45}
+        h = pd.DataFrame([self._team_stats.get(t, default) for t in home_teams])
+        a = pd.DataFrame([self._team_stats.get(t, default) for t in away_teams])
+        features = pd.DataFrame({
+            'h_attack': h['attack'],
+            'h_defense': h['defense'],
+            'h_form': h['form'],
+            'h_home_adv': h['home_advantage'],
+            'a_attack': a['attack'],
+            'a_defense': a['defense'],
+            'a_form': a['form'],
+            'attack_diff': h['attack'] - a['attack'],
+            'defense_diff': h['defense'] - a['defense'],
+            'form_diff': h['form'] - a['form'],
+        })
+        
+        try:
+            raw = self.model_res.predict_proba(features)
+        except Exception as e:
+            logger.error(f"Batch prediction failed: {e}")
+            return np.full((n, 3), 0.33)
+        # Place each column by its class label (a window may not contain all three outcomes)
+        probs = np.zeros((n, 3))
+        probs[:, self.model_res.classes_.astype(int)] = raw
+        return np.round(probs, 4)
+
     def predict_advanced_stats(self, home_team, away_team):
         """
         Estimates advanced stats (Corners, Shots, Cards, Fouls, BTTS, Goals)
@@ -14,15 +14,23 @@ import torch.optim as optim
 import numpy as np
 import logging
 import os
+import time
 
 logger = logging.getLogger("OddsAbsoluteRL")
 
+# Replay buffer: resolved samples accumulate on disk and are trained in batches of TRAIN_BATCH,
+# or whatever is there once the oldest sample is BUFFER_MAX_AGE seconds old
+TRAIN_BATCH = 256
+BUFFER_MAX_AGE = 24 * 3600
+# Width of the model input / build_anonymous_features vector
+N_FEATURES = 14
+
 # ============================================================
 # MODEL: LSTM for Sequential Pattern Recognition
 # ============================================================
 
 class OddsAbsoluteRNN(nn.Module):
-    def __init__(self, input_size=14, hidden_size=128, num_layers=3, dropout=0.2):
+    def __init__(self, input_size=N_FEATURES, hidden_size=128, num_layers=3, dropout=0.2):
         """
         LSTM Model for ODDS-ABSOLUTE v2.0 (Project Omniscience).
         
@@ -136,6 +144,7 @@ class AbsoluteLoss(nn.Module):
 
 class RLEngine:
     MODEL_PATH = os.path.join(os.path.dirname(__file__), "..", "models", "omniscience_lstm.pt")
+    BUFFER_PATH = os.path.join(os.path.dirname(__file__), "..", "models", "replay_buffer.npz")
     
     def __init__(self):
         self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
@@ -169,6 +178,17 @@ class RLEngine:
                 "2": round(probs[0][2].item(), 4)
             }
             
+    def predict_batch(self, features_matrix):
+        """
+        features_matrix: array of shape (N, 14) — one row per match
+        Returns: np.ndarray (N, 3) with [Home, Draw, Away] probabilities
+        """
+        self.model.eval()
+        with torch.inference_mode():
+            # float32 input is shared with torch, not copied (as_tensor on CPU)
+            x = torch.as_tensor(np.asarray(features_matrix, dtype=np.float32)).unsqueeze(1).to(self.device)  # (N, 1, 14)
+            return self.model(x).cpu().numpy()
+            
     def train_step(self, features, target_idx):
         """
         Single-match training step (Back-Loop Learning).
@@ -207,8 +227,9 @@ class RLEngine:
         Train on multiple matches at once (from DB history).
         batch_features: List of feature vectors (each 14-dim)
         batch_targets: List of target indices (0, 1, or 2)
-        Returns: average loss
+        Returns: average loss (None if the batch is too small to train on)
         """
+        if len(batch_features) < 2: return None  # BatchNorm needs >1 sample in train mode
         self.model.train()
         
         x = torch.FloatTensor(batch_features).unsqueeze(1).to(self.device)  # (batch, 1, 14)
@@ -225,6 +246,54 @@ class RLEngine:
         
         return loss.item()
 
+    def add_to_buffer(self, features, targets):
+        """
+        Appends resolved samples to the persistent replay buffer (float32 features, int8 targets).
+        Returns: buffer size after the append
+        """
+        X, y, since = self._load_buffer()
+        X = np.concatenate([X, np.asarray(features, dtype=np.float32).reshape(-1, X.shape[1])]).astype(np.float32, copy=False)
+        y = np.concatenate([y, np.asarray(targets, dtype=np.int8)])
+        self._save_buffer(X, y, since if since else time.time())
+        return len(y)
+
+    def train_from_buffer(self, force=False):
+        """
+        Trains on the buffered samples once TRAIN_BATCH are available or the oldest is
+        BUFFER_MAX_AGE old (or force), then saves the model and empties the buffer.
+        Returns: number of samples trained on (0 while still accumulating)
+        """
+        X, y, since = self._load_buffer()
+        if len(y) < 2: return 0  # BatchNorm needs >1 sample per batch
+        if not force and len(y) < TRAIN_BATCH and time.time() - since < BUFFER_MAX_AGE: return 0
+        
+        # Near-equal chunks of at most TRAIN_BATCH, so no trailing single-sample batch
+        n_chunks = -(-len(y) // TRAIN_BATCH)
+        trained = 0
+        for xb, yb in zip(np.array_split(X.astype(np.float32), n_chunks), np.array_split(y.astype(np.int64), n_chunks)):
+            if self.train_on_batch(xb, yb) is not None: trained += len(yb)
+        if trained: self.save_model()
+        try:
+            os.remove(self.BUFFER_PATH)
+        except OSError:
+            pass
+        return trained
+
+    def _load_buffer(self):
+        """Returns (features, targets, oldest_sample_ts); empty arrays and None if there is no buffer."""
+        try:
+            with np.load(self.BUFFER_PATH) as d:
+                return d["X"], d["y"], float(d["since"])
+        except (OSError, KeyError, ValueError):
+            return np.empty((0, N_FEATURES), dtype=np.float32), np.empty(0, dtype=np.int8), None
+
+    def _save_buffer(self, X, y, since):
+        os.makedirs(os.path.dirname(self.BUFFER_PATH), exist_ok=True)
+        tmp = f"{self.BUFFER_PATH}.tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, X=X, y=y, since=since)
+        os.replace(tmp, self.BUFFER_PATH)  # never leave a half-written buffer behind
+
     def experience_replay(self, batch_size=32):
         """
         Replays past experiences for additional learning.
@@ -1,8 +1,23 @@
 import requests
+import time
+import threading
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import logging
 import urllib3
 import json
 from typing import List, Dict, Optional
+try:
+    import disk_cache
+except ImportError:
+    from src import disk_cache
+# Optional C JSON parser (several times faster on the multi-hundred-KB allscores payload)
+try:
+    from orjson import loads as _loads
+except ImportError:
+    _loads = json.loads
 
 # Suppress SSL warnings
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
@@ -17,14 +32,87 @@ HEADERS = {
     "Referer": "https://www.365scores.com/"
 }
 
+# Keep-alive pool sized for the concurrent per-game fetches
+POOL_SIZE = 64
+# Community votes move slowly; reuse them across runs for this long (s)
+PREDICTIONS_TTL = 120
+# get_games payloads shared by every Scraper365 in the process (generate + check in one cycle)
+GAMES_TTL = 60
+_GAMES_CACHE = {}  # date_str -> (fetched_at, games)
+_GAMES_LOCK = threading.Lock()
+# Per-request timeout (s) so one stalled game cannot hold a worker indefinitely
+REQUEST_TIMEOUT = 10
+# Shared pool for the bulk fan-outs: created once per process, so Streamlit reruns don't pay thread startup
+BULK_WORKERS = 16
+_BULK_POOL = ThreadPoolExecutor(max_workers=BULK_WORKERS, thread_name_prefix="scraper365")
+# Details of ended games never change; shared by every instance (home/away overlap, page reruns)
+ENDED_DETAILS_MAX = 4096
+_ENDED_DETAILS = {}  # game_id -> details
+_ENDED_LOCK = threading.Lock()
+# get_teams_mu_bulk results: (team_id, n_last) -> (mu, expires_at); plain dict memo, no pickling
+TEAM_MU_TTL = 3600
+_TEAM_MU = {}
+_MU_LOCK = threading.Lock()
+# Goals-per-game fallback for a team with no usable history
+DEFAULT_MU = 1.5
+
+def _goals_for(game: Dict, team_id: int) -> Optional[float]:
+    """Goals `team_id` scored in one game-details payload; None when the score is missing or not a number."""
+    try:
+        side = game['homeCompetitor'] if game['homeCompetitor']['id'] == team_id else game['awayCompetitor']
+        score = side['score']
+    except (KeyError, TypeError):
+        return None
+    # Postponed/abandoned games come back without a score (None, or -1 for "not played")
+    if isinstance(score, bool) or not isinstance(score, (int, float)) or score < 0:
+        return None
+    return float(score)
+
+def build_session() -> requests.Session:
+    """Pooled keep-alive session with retry/backoff on throttling and 5xx."""
+    session = requests.Session()
+    retry = Retry(total=3, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504), allowed_methods=("GET",))
+    adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=retry)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update(HEADERS)
+    session.verify = False
+    return session
+
+_SHARED_SESSION = None
+_SESSION_LOCK = threading.Lock()
+
+def shared_session() -> requests.Session:
+    """
+    Process-wide session used by every Scraper365 built without one: Streamlit reruns and the
+    module-level scrapers (player_db, fixtures_loader) reuse the same warm TLS connections.
+    """
+    global _SHARED_SESSION
+    with _SESSION_LOCK:
+        if _SHARED_SESSION is None:
+            _SHARED_SESSION = build_session()
+        return _SHARED_SESSION
+
 class Scraper365:
-    def __init__(self):
+    def __init__(self, session: Optional[requests.Session] = None):
         self.base_url = "https://webws.365scores.com/web/game/"
         self.games_url = "https://webws.365scores.com/web/games/allscores"
         self.cache = {} 
+        self.session = session or shared_session()
 
     def get_games(self, date_str: str) -> List[Dict]:
-        """Fetches all games for a specific date (dd/mm/yyyy)."""
+        """Fetches all games for a specific date (dd/mm/yyyy). Cached process-wide for GAMES_TTL seconds."""
+        with _GAMES_LOCK:
+            hit = _GAMES_CACHE.get(date_str)
+        if hit and time.time() - hit[0] < GAMES_TTL:
+            return hit[1]
+        games = self._fetch_games(date_str)
+        if games:
+            with _GAMES_LOCK:
+                _GAMES_CACHE[date_str] = (time.time(), games)
+        return games
+
+    def _fetch_games(self, date_str: str) -> List[Dict]:
         params = {
             'appTypeId': 5,
             'langId': 1,
@@ -36,9 +124,9 @@ class Scraper365:
             'showOdds': 'true'
         }
         try:
-            resp = requests.get(self.games_url, params=params, headers=HEADERS, verify=False)
+            resp = self.session.get(self.games_url, params=params, timeout=REQUEST_TIMEOUT)
             if resp.status_code == 200:
-                return resp.json().get('games', [])
+                return _loads(resp.content).get('games', [])
             return []
         except Exception:
             return []
@@ -50,9 +138,9 @@ class Scraper365:
             
         url = f"{self.base_url}?gameId={game_id}"
         try:
-            resp = requests.get(url, headers=HEADERS, verify=False)
+            resp = self.session.get(url, timeout=REQUEST_TIMEOUT)
             if resp.status_code == 200:
-                data = resp.json()
+                data = _loads(resp.content)
                 self.cache[game_id] = data
                 return data
             return None
@@ -97,13 +185,68 @@ class Scraper365:
     def get_team_results(self, team_id: int) -> List[int]:
         url = f"https://webws.365scores.com/web/games/results/?competitors={team_id}&appTypeId=5&langId=1"
         try:
-            resp = requests.get(url, headers=HEADERS, verify=False)
+            resp = self.session.get(url, timeout=REQUEST_TIMEOUT)
             if resp.status_code == 200:
-                return [g['id'] for g in resp.json().get('games', []) if g.get('statusText') == "Ended"]
+                return [g['id'] for g in _loads(resp.content).get('games', []) if g.get('statusText') == "Ended"]
             return []
         except Exception:
             return []
 
+    def get_teams_mu_bulk(self, team_ids: List[int], n_last: int = 5) -> Dict[int, float]:
+        """
+        Average goals scored over each team's last `n_last` ended games, for a whole page of teams
+        in one call (DEFAULT_MU when a team has no usable history). Games with a missing or
+        malformed score are skipped, and a failure on one team never affects the others. A game shared by two of the teams
+        (e.g. they met last week) is fetched once; results are memoized for TEAM_MU_TTL seconds.
+        Returns: {team_id: mu}
+        """
+        now = time.time()
+        mus = {}
+        with _MU_LOCK:
+            for team_id in dict.fromkeys(t for t in team_ids if t is not None):
+                hit = _TEAM_MU.get((team_id, n_last))
+                if hit and hit[1] > now:
+                    mus[team_id] = hit[0]
+        team_ids = [t for t in dict.fromkeys(team_ids) if t is not None and t not in mus]
+        if not team_ids:
+            return mus
+        # Network-bound: issue the requests concurrently on the shared pool
+        results = {team_id: ids[:n_last] for team_id, ids in zip(team_ids, _BULK_POOL.map(self.get_team_results, team_ids))}
+        game_ids = list(dict.fromkeys(gid for ids in results.values() for gid in ids))
+        with _ENDED_LOCK:
+            details = {gid: _ENDED_DETAILS[gid] for gid in game_ids if gid in _ENDED_DETAILS}
+        missing = [gid for gid in game_ids if gid not in details]
+        fetched = dict(zip(missing, _BULK_POOL.map(self.get_game_details, missing)))
+        details.update(fetched)
+        with _ENDED_LOCK:
+            if len(_ENDED_DETAILS) + len(fetched) > ENDED_DETAILS_MAX:
+                _ENDED_DETAILS.clear()
+            _ENDED_DETAILS.update((gid, rd) for gid, rd in fetched.items() if rd)
+        
+        for team_id, ids in results.items():
+            try:
+                goals = [gf for gf in (_goals_for(details[gid].get('game'), team_id) for gid in ids if details.get(gid))
+                         if gf is not None]
+                mus[team_id] = statistics.fmean(goals) if goals else DEFAULT_MU
+            except Exception as e:
+                logger.warning(f"Team {team_id} mu fell back to default: {e}")
+                mus[team_id] = DEFAULT_MU
+        
+        expires = time.time() + TEAM_MU_TTL
+        with _MU_LOCK:
+            _TEAM_MU.update(((team_id, n_last), (mus[team_id], expires)) for team_id in team_ids)
+        return mus
+
+    def get_games_full(self, date_str: str, n_last: int = 5, limit: Optional[int] = None):
+        """
+        Page batch entry point: the day's games plus {team_id: mu} (get_teams_mu_bulk) for the
+        teams of the first `limit` games, so a page needs a single (cacheable) scraper call.
+        Returns: (games, mus)
+        """
+        games = self.get_games(date_str)
+        team_ids = [g.get(side, {}).get('id') for g in games[:limit] for side in ('homeCompetitor', 'awayCompetitor')]
+        return games, self.get_teams_mu_bulk(team_ids, n_last)
+
     def get_h2h_data(self, team_a_id: int, team_b_id: int) -> List[Dict]:
         """
         Attempts to find the last 10 direct encounters.
@@ -111,13 +254,14 @@ class Scraper365:
         # 365Scores usually has a specific H2H endpoint: web/games/h2h/?competitors=ID1,ID2
         url = f"https://webws.365scores.com/web/games/h2h/?competitors={team_a_id},{team_b_id}&appTypeId=5&langId=1"
         try:
-            resp = requests.get(url, headers=HEADERS, verify=False)
+            resp = self.session.get(url, timeout=REQUEST_TIMEOUT)
             if resp.status_code == 200:
-                return resp.json().get('games', [])[:10]
+                return _loads(resp.content).get('games', [])[:10]
             return []
         except Exception:
             return []
 
+    @disk_cache.memoize("predictions", PREDICTIONS_TTL)
     def get_game_predictions(self, game_id: int) -> Dict:
         details = self.get_game_details(game_id)
         if not details: return {}
@@ -11,59 +11,57 @@ import logging
 
 logger = logging.getLogger("OmniscienceSimulator")
 
+# (paths x bets) cells per vectorized block: ~4 MB per float64 matrix whatever num_bets is
+BLOCK_CELLS = 500_000
+
 
 class ValueSimulator:
-    def __init__(self, bankroll=1000.0, iterations=50000):
+    def __init__(self, bankroll=1000.0, iterations=50000, seed=None):
         self.bankroll_start = bankroll
         self.iterations = iterations
+        self.rng = np.random.default_rng(seed)
 
     def run_monte_carlo(self, p_win, odds, stake_pct, num_bets=500):
         """
         Simulates 50,000 paths of betting strategy.
         Returns comprehensive metrics including Sharpe Ratio.
+
+        Vectorized over paths: each block draws its (paths, bets) outcomes at once and
+        compounds the bankroll with a cumulative product. A path stops at ruin (bankroll < 1).
         """
-        results = []
+        win_growth = 1 + stake_pct * (odds - 1)
+        loss_growth = 1 - stake_pct
+        # No bets: every path ends where it started, nothing is ruined
+        results = np.full(self.iterations, float(self.bankroll_start))
         ruin_count = 0
-        all_returns = []
+        n_wins = n_losses = 0
         
-        for _ in range(self.iterations):
-            current_bank = self.bankroll_start
-            path = [current_bank]
-            path_returns = []
-            
-            outcomes = np.random.choice([1, 0], size=num_bets, p=[p_win, 1 - p_win])
+        path_chunk = max(1, BLOCK_CELLS // max(num_bets, 1))
+        for lo in range(0, self.iterations if num_bets > 0 else 0, path_chunk):
+            n = min(path_chunk, self.iterations - lo)
+            wins = self.rng.random((n, num_bets)) < p_win
+            banks = self.bankroll_start * np.cumprod(np.where(wins, win_growth, loss_growth), axis=1)
             
-            for win in outcomes:
-                stake = current_bank * stake_pct
-                if win:
-                    profit = stake * (odds - 1)
-                    current_bank += profit
-                else:
-                    profit = -stake
-                    current_bank -= stake
-                
-                pct_return = profit / max(current_bank - profit, 1)
-                path_returns.append(pct_return)
-                path.append(current_bank)
-                
-                if current_bank < 1.0:
-                    ruin_count += 1
-                    break
+            # Last bet played per path: the first one that ruins it, else the final bet
+            ruined = banks < 1.0
+            has_ruin = ruined.any(axis=1)
+            last = np.where(has_ruin, ruined.argmax(axis=1), num_bets - 1)
+            ruin_count += int(has_ruin.sum())
+            results[lo:lo + n] = banks[np.arange(n), last]
             
-            results.append(path[-1])
-            all_returns.extend(path_returns)
+            played = np.arange(num_bets) <= last[:, None]
+            n_w = int((wins & played).sum())
+            n_wins += n_w
+            n_losses += int(played.sum()) - n_w
             
         prob_ruin = ruin_count / self.iterations
         avg_final = np.mean(results)
         
-        # Sharpe Ratio
-        sharpe = self._calculate_sharpe(all_returns)
+        # Sharpe Ratio: every bet returns either +stake_pct*(odds-1) or -stake_pct of the bankroll
+        sharpe = self._calculate_sharpe_binary(win_growth - 1, n_wins, loss_growth - 1, n_losses)
         
         # Percentiles for risk assessment
-        p5 = np.percentile(results, 5)
-        p25 = np.percentile(results, 25)
-        p75 = np.percentile(results, 75)
-        p95 = np.percentile(results, 95)
+        p5, p25, p75, p95 = np.percentile(results, [5, 25, 75, 95])
         
         return {
             "prob_ruin": round(prob_ruin, 4),
@@ -89,13 +87,24 @@ class ValueSimulator:
             return 0.0
         return (mean_r - risk_free) / std_r * np.sqrt(365)
 
+    def _calculate_sharpe_binary(self, r_win, n_wins, r_loss, n_losses, risk_free=0.0):
+        """_calculate_sharpe for returns that take only two values, from their counts."""
+        n = n_wins + n_losses
+        if n < 2:
+            return 0.0
+        mean_r = (n_wins * r_win + n_losses * r_loss) / n
+        std_r = np.sqrt(n_wins * n_losses) / n * abs(r_win - r_loss)
+        if std_r == 0:
+            return 0.0
+        return (mean_r - risk_free) / std_r * np.sqrt(365)
+
     def _avg_max_drawdown(self, final_bankrolls):
         """Average maximum drawdown from peak."""
-        below_start = [b for b in final_bankrolls if b < self.bankroll_start]
-        if not below_start:
+        final_bankrolls = np.asarray(final_bankrolls)
+        below_start = final_bankrolls[final_bankrolls < self.bankroll_start]
+        if not below_start.size:
             return 0.0
-        worst_losses = [(self.bankroll_start - b) / self.bankroll_start * 100 for b in below_start]
-        return np.mean(worst_losses)
+        return np.mean((self.bankroll_start - below_start) / self.bankroll_start * 100)
 
     def generate_equity_comparison(self, history_df):
         """
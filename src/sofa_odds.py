@@ -1,11 +1,41 @@
+import math
 import requests
 import logging
+import functools
 from datetime import datetime
+try:
+    import disk_cache
+except ImportError:
+    from src import disk_cache
+# Optional C JSON parser; scheduled-events payloads run to hundreds of KB
+try:
+    from orjson import loads as _loads
+except ImportError:
+    from json import loads as _loads
 
 logger = logging.getLogger("SofaOdds")
 
+# Disk-cache TTLs (s): the day's schedule is stable, odds move
+EVENTS_TTL = 900
+ODDS_TTL = 120
+
+@functools.lru_cache(maxsize=1024)
+def frac_to_decimal(frac_str):
+    """
+    Convert fractional ('9/4' -> 3.25) or decimal ('2.10') odds to decimal odds, unrounded; unparseable -> NaN.
+    The one odds parser for every SofaScore consumer (auto-bet, dashboard).
+    Memoized: a page only ever sees a few dozen distinct prices across hundreds of market choices.
+    """
+    num, sep, den = str(frac_str).partition('/')
+    try:
+        return 1 + float(num) / float(den) if sep else float(num)
+    except (ValueError, ZeroDivisionError):
+        return math.nan
+
 class SofaOdds:
-    def __init__(self):
+    def __init__(self, session=None):
+        # Reusable keep-alive connections; per-request headers below override any session defaults
+        self.session = session or requests.Session()
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Referer': 'https://www.sofascore.com/',
@@ -16,12 +46,15 @@ class SofaOdds:
         """Fetch all football events from SofaScore for a given date (YYYY-MM-DD)."""
         if not date_str:
             date_str = datetime.now().strftime("%Y-%m-%d")
-            
+        return self._fetch_events(date_str)
+
+    @disk_cache.memoize("sofa_events", EVENTS_TTL)
+    def _fetch_events(self, date_str):
         url = f"https://api.sofascore.com/api/v1/sport/football/scheduled-events/{date_str}"
         try:
-            r = requests.get(url, headers=self.headers, verify=False, timeout=10)
+            r = self.session.get(url, headers=self.headers, verify=False, timeout=10)
             if r.status_code == 200:
-                return r.json().get('events', [])
+                return _loads(r.content).get('events', [])
             else:
                 logger.warning(f"SofaScore Events Error: {r.status_code}")
         except Exception as e:
@@ -36,9 +69,9 @@ class SofaOdds:
         # Typically endpoint is /event/{id}/odds/1/all
         url = f"https://api.sofascore.com/api/v1/event/{event_id}/odds/1/all"
         try:
-            r = requests.get(url, headers=self.headers, verify=False, timeout=10)
+            r = self.session.get(url, headers=self.headers, verify=False, timeout=10)
             if r.status_code == 200:
-                return r.json().get('markets', [])
+                return _loads(r.content).get('markets', [])
         except Exception as e:
             logger.error(f"SofaScore Odds Exception ({event_id}): {e}")
         return []
@@ -52,6 +85,7 @@ class SofaOdds:
                 return m.get('choices', [])
         return []
 
+    @disk_cache.memoize("sofa_odds", ODDS_TTL)
     def process_game_odds(self, game_id):
         """Returns a structured dict of odds for analysis."""
         markets = self.fetch_odds(game_id)
@@ -8,6 +8,8 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from src.ml_engine import ValueBetML
 from src.value_detector import ValueDetector
 from src.backtester import Backtester
+from src.database import OddsBreakerDB
+from src.scraper_365 import Scraper365, DEFAULT_MU
 
 def test_integration():
     print("TEST: Initializing ML Engine...")
@@ -40,5 +42,54 @@ def test_integration():
     else:
         print("FAIL: Backtest returned None.")
 
+def test_market_type_migration_postgres():
+    """The bets_history migration must survive psycopg2's paramstyle (literal LIKE '%...' wildcards)."""
+    executed = []
+
+    class Cursor:
+        rowcount = 0
+        def execute(self, query, params=None):
+            if params is not None:
+                query % tuple(params)  # psycopg2 interpolates (and chokes on bare '%') only when params are given
+            executed.append(query)
+        def fetchall(self):
+            return [("bets_history",)]
+
+    class Conn:
+        def cursor(self): return Cursor()
+        def commit(self): pass
+        def rollback(self): pass
+
+    class Pool:
+        def getconn(self): return Conn()
+        def putconn(self, conn): pass
+
+    db = object.__new__(OddsBreakerDB)  # bypass the singleton
+    db.engine_type, db._initialized, db.postgreSQL_pool = 'postgres', True, Pool()
+    db._ensure_market_type()
+    assert any("UPDATE bets_history SET market_type" in q for q in executed), executed
+    print("PASS: market_type backfill runs on Postgres")
+
+def test_teams_mu_bulk_malformed_game():
+    """A postponed/garbled game in one team's history must not wipe out mu for the page."""
+    def game(home_id, home_score, away_id, away_score):
+        return {'game': {'homeCompetitor': {'id': home_id, 'score': home_score}, 'awayCompetitor': {'id': away_id, 'score': away_score}}}
+    details = {
+        990001: game(91001, 2, 91002, 1),
+        990002: game(91001, None, 91003, None),    # postponed: no score
+        990003: {'game': {'homeCompetitor': {}}},  # malformed: no ids / no away side
+        990004: game(91002, 3, 91001, 0),
+    }
+    history = {91001: [990001, 990002, 990003, 990004], 91002: [990001, 990004], 91003: [990002]}
+
+    scraper = Scraper365(session=object())
+    scraper.get_team_results = lambda team_id: history.get(team_id, [])
+    scraper.get_game_details = details.get
+    mus = scraper.get_teams_mu_bulk([91001, 91002, 91003, 91004])
+    assert mus == {91001: 1.0, 91002: 2.0, 91003: DEFAULT_MU, 91004: DEFAULT_MU}, mus
+    print("PASS: team mu survives malformed games")
+
 if __name__ == "__main__":
     test_integration()
+    test_market_type_migration_postgres()
+    test_teams_mu_bulk_malformed_game()
@@ -1,6 +1,7 @@
 class ValueDetector:
-    def __init__(self):
-        pass
+    def __init__(self, threshold=0.05):
+        # Minimum EV for a value bet (5%); the backtester applies it to whole odds/prob matrices
+        self.threshold = threshold
 
     def calculate_margin(self, odds_home, odds_draw, odds_away):
         """
@@ -29,7 +30,7 @@ class ValueDetector:
         """
         ev = (model_prob * bookmaker_odds) - 1
         
-        is_value = ev > 0.05 # Threshold: 5% Value
+        is_value = ev > self.threshold # Threshold: 5% Value
         grade = "NO BET"
         
         if ev > 0.20: grade = "💎 DIAMOND"